@@ -0,0 +1,124 @@
+import gc
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('core.boot')
+
+
+@contextmanager
+def _timed(timings, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def _template_names(engine):
+    """Имена всех шаблонов из DIRS и templates/ приложений."""
+    from django.template.utils import get_app_template_dirs
+
+    dirs = list(engine.dirs)
+    if engine.app_dirs:
+        dirs.extend(get_app_template_dirs('templates'))
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            for file in files:
+                if file.endswith(('.html', '.txt')):
+                    yield os.path.relpath(
+                        os.path.join(root, file), directory
+                    )
+
+
+def warm_up(freeze=True):
+    """Делает до первого запроса то, что иначе достаётся ему.
+
+    Строит URL resolver, компилирует шаблоны (их запоминает cached
+    loader, то есть при DEBUG = False), открывает кэш и бэкенд миниатюр
+    sorl. Соединения с БД закрываются: после fork воркерам нужны свои.
+    freeze=True убирает пережившие загрузку объекты из поля зрения GC,
+    чтобы сборщик не трогал их страницы и воркеры делили их с мастером
+    через copy-on-write. Возвращает время шагов в миллисекундах.
+    """
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.db import connections
+    from django.template import TemplateSyntaxError, engines
+    from django.urls import get_resolver, reverse
+    from sorl.thumbnail import default
+
+    timings = {}
+    with _timed(timings, 'urls'):
+        # reverse заполняет словари resolver'а и импортирует все views
+        get_resolver()
+        reverse('posts:index')
+    with _timed(timings, 'templates'):
+        for engine in engines.all():
+            for name in _template_names(engine.engine):
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError:
+                    # Фрагменты вроде писем могут не компилироваться
+                    # отдельно; их соберёт первый запрос
+                    logger.debug('Шаблон %s пропущен', name)
+    with _timed(timings, 'cache'):
+        for alias in settings.CACHES:
+            caches[alias].get('boot:warm-up')
+    with _timed(timings, 'thumbnails'):
+        for lazy in (
+            default.backend, default.kvstore, default.engine, default.storage
+        ):
+            # Обращение к атрибуту LazyObject создаёт сам объект
+            lazy.__class__
+    connections.close_all()
+    if freeze:
+        with _timed(timings, 'gc'):
+            gc.collect()
+            gc.freeze()
+    logger.info(json.dumps(timings))
+    return timings
+
+
+def profile_setup():
+    """Загружает Django с замерами по приложениям и печатает JSON.
+
+    Запускается командой boot_profile в отдельном процессе, где ещё
+    ничего не импортировано.
+    """
+    import django
+    from django.apps.config import AppConfig
+
+    apps = {}
+    create = AppConfig.create.__func__
+    import_models = AppConfig.import_models
+
+    def timed(config, stage, method):
+        def wrapper(*args, **kwargs):
+            with _timed(apps[config.label], stage):
+                return method(*args, **kwargs)
+        return wrapper
+
+    def create_timed(cls, entry):
+        started = time.perf_counter()
+        config = create(cls, entry)
+        apps[config.label] = {
+            'import': round((time.perf_counter() - started) * 1000, 2)
+        }
+        config.ready = timed(config, 'ready', config.ready)
+        return config
+
+    def import_models_timed(self):
+        with _timed(apps[self.label], 'models'):
+            import_models(self)
+
+    AppConfig.create = classmethod(create_timed)
+    AppConfig.import_models = import_models_timed
+    result = {'apps': apps, 'setup': {}}
+    with _timed(result['setup'], 'total'):
+        django.setup()
+    if os.environ.get('BOOT_PROFILE_WARM'):
+        result['warm_up'] = warm_up(freeze=False)
+    print(json.dumps(result))
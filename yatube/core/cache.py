@@ -0,0 +1,284 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Время доступа обновляется не чаще раза в столько секунд: иначе каждое
+# чтение превращалось бы в запись и воркеры ждали бы друг друга.
+ACCESS_RESOLUTION = 5
+# Ограничение SQLite на число параметров в запросе
+MAX_PARAMS = 500
+INT64 = range(-2 ** 63, 2 ** 63)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_stats SET bytes = bytes + new.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_stats SET bytes = bytes - old.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache BEGIN
+    UPDATE cache_stats SET bytes = bytes + new.size - old.size WHERE id = 0;
+END;
+'''
+
+UPSERT = '''
+INSERT INTO cache (key, value, expires, accessed, size)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    value = excluded.value,
+    expires = excluded.expires,
+    accessed = excluded.accessed,
+    size = excluded.size
+'''
+
+
+def _encode(value):
+    # Целые числа хранятся как INTEGER, чтобы incr делал UPDATE в SQL
+    if type(value) is int and value in INT64:
+        return value, 8
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return data, len(data)
+
+
+def _decode(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+def _chunks(items, size=MAX_PARAMS):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех воркеров на машине.
+
+    LOCATION — путь к файлу, ':memory:' даёт отдельный кэш процесса.
+    Размер ограничен OPTIONS['MAX_BYTES']: при превышении сначала
+    удаляются просроченные записи, затем давно не читанные (LRU), пока
+    не освободится 1/CULL_FREQUENCY бюджета. Просроченные записи при
+    чтении просто не отдаются и уходят при следующей чистке.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._location = location
+        self._max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self._timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    def _path(self):
+        if self._location == ':memory:':
+            return f'file:cache-{os.getpid()}?mode=memory&cache=shared'
+        return f'file:{self._location}'
+
+    def _connection(self):
+        # Соединение не переживает fork: после него открываем новое
+        if getattr(self._local, 'pid', None) != os.getpid():
+            db = sqlite3.connect(
+                self._path(), timeout=self._timeout,
+                isolation_level=None, uri=True
+            )
+            if self._location != ':memory:':
+                db.execute('PRAGMA journal_mode = WAL')
+                db.execute('PRAGMA synchronous = NORMAL')
+            db.executescript(SCHEMA)
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return self._local.db
+
+    @contextmanager
+    def _write(self):
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _store(self, db, key, value, timeout, now):
+        data, size = _encode(value)
+        db.execute(UPSERT, (
+            key, data, self.get_backend_timeout(timeout), now,
+            size + len(key)
+        ))
+
+    def _cull(self, db, now):
+        used, = db.execute('SELECT bytes FROM cache_stats').fetchone()
+        if used <= self._max_bytes:
+            return
+        db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        used, = db.execute('SELECT bytes FROM cache_stats').fetchone()
+        excess = used - (
+            self._max_bytes - self._max_bytes // self._cull_frequency
+        )
+        victims = []
+        rows = db.execute('SELECT key, size FROM cache ORDER BY accessed')
+        for key, size in rows:
+            if excess <= 0:
+                break
+            victims.append(key)
+            excess -= size
+        for chunk in _chunks(victims):
+            db.execute(
+                'DELETE FROM cache WHERE key IN '
+                f'({", ".join("?" * len(chunk))})',
+                chunk
+            )
+
+    def _touch_accessed(self, keys, now):
+        if keys:
+            with self._write() as db:
+                for chunk in _chunks(keys):
+                    db.execute(
+                        'UPDATE cache SET accessed = ? WHERE key IN '
+                        f'({", ".join("?" * len(chunk))})',
+                        (now, *chunk)
+                    )
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        originals = {self._key(key, version): key for key in keys}
+        db = self._connection()
+        now = time.time()
+        found = {}
+        stale = []
+        for chunk in _chunks(list(originals)):
+            rows = db.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                chunk
+            )
+            for key, value, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    continue
+                found[originals[key]] = _decode(value)
+                if now - accessed > ACCESS_RESOLUTION:
+                    stale.append(key)
+        self._touch_accessed(stale, now)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            self._store(db, key, value, timeout, now)
+            self._cull(db, now)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self._write() as db:
+            for key, value in data.items():
+                self._store(db, self._key(key, version), value, timeout, now)
+            self._cull(db, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            row = db.execute(
+                'SELECT expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and (row[0] is None or row[0] > now):
+                return False
+            self._store(db, key, value, timeout, now)
+            self._cull(db, now)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            row = db.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                raise ValueError(f"Key '{key}' not found")
+            if isinstance(row[0], int):
+                db.execute(
+                    'UPDATE cache SET value = value + ?, accessed = ? '
+                    'WHERE key = ?',
+                    (delta, now, key)
+                )
+                return row[0] + delta
+            value = pickle.loads(row[0]) + delta
+            data, size = _encode(value)
+            db.execute(
+                'UPDATE cache SET value = ?, accessed = ?, size = ? '
+                'WHERE key = ?',
+                (data, now, size + len(key), key)
+            )
+            return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            return db.execute(
+                'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), now, key, now)
+            ).rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._write() as db:
+            return db.execute(
+                'DELETE FROM cache WHERE key = ?', (key,)
+            ).rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        with self._write() as db:
+            for chunk in _chunks(keys):
+                db.execute(
+                    'DELETE FROM cache WHERE key IN '
+                    f'({", ".join("?" * len(chunk))})',
+                    chunk
+                )
+
+    def clear(self):
+        with self._write() as db:
+            db.execute('DELETE FROM cache')
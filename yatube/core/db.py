@@ -0,0 +1,68 @@
+import itertools
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+# batch_size для bulk_create пересборок и миграций: None — размер пачки
+# подбирает Django. На SQLite пачка вставляется одним составным SELECT,
+# а их в запросе не больше 500, так что явные 1000 там падают.
+BULK_BATCH_SIZE = None
+
+
+def apply_pragmas(cursor, pragmas=None):
+    """Выполняет PRAGMA из настройки SQLITE_PRAGMAS на соединении."""
+    if pragmas is None:
+        pragmas = settings.SQLITE_PRAGMAS
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик connection_created: настраивает новые соединения SQLite.
+
+    Соединения живут CONN_MAX_AGE секунд, поэтому PRAGMA выполняются
+    один раз на соединение, а не на запрос.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor)
+
+
+def is_locked(error):
+    # SQLITE_BUSY и SQLITE_LOCKED приходят только текстом сообщения
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+def backoff(attempt):
+    """Пауза перед повтором: экспонента от DB_RETRY_DELAY с разбросом,
+    чтобы конкурирующие писатели не просыпались одновременно."""
+    delay = settings.DB_RETRY_DELAY * 2 ** attempt
+    time.sleep(delay * random.uniform(0.5, 1.5))
+
+
+def retry_on_locked(func):
+    """Повторяет функцию, если SQLite ответил «database is locked».
+
+    Каждая попытка идёт в своей транзакции, поэтому неудачная
+    откатывается целиком и повтор не создаёт дублей. Внутри чужой
+    транзакции повторять нельзя: ошибка пробрасывается сразу.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in itertools.count():
+            nested = transaction.get_connection().in_atomic_block
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if (
+                    nested or not is_locked(error)
+                    or attempt + 1 >= settings.DB_RETRY_ATTEMPTS
+                ):
+                    raise
+            backoff(attempt)
+    return wrapper
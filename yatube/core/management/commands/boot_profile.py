@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает, сколько занимают импорт, модели и ready() каждого '
+        'приложения при загрузке Django в чистом процессе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Заодно замерить шаги core.boot.warm_up'
+        )
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        env['DJANGO_SETTINGS_MODULE'] = os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'yatube.settings'
+        )
+        env['PYTHONPATH'] = os.pathsep.join(
+            filter(None, [settings.BASE_DIR, env.get('PYTHONPATH')])
+        )
+        if options['warm']:
+            env['BOOT_PROFILE_WARM'] = '1'
+        process = subprocess.run(
+            [sys.executable, '-c',
+             'from core.boot import profile_setup; profile_setup()'],
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        if process.returncode:
+            raise CommandError(process.stderr.decode())
+        result = json.loads(process.stdout.decode().splitlines()[-1])
+        rows = sorted(
+            result['apps'].items(),
+            key=lambda item: -sum(item[1].values())
+        )
+        self.stdout.write(
+            f'{"приложение":<16} {"импорт":>9} {"модели":>9} '
+            f'{"ready()":>9} {"всего":>9} мс'
+        )
+        for label, times in rows:
+            self.stdout.write(
+                f'{label:<16} {times.get("import", 0):>9.2f} '
+                f'{times.get("models", 0):>9.2f} '
+                f'{times.get("ready", 0):>9.2f} '
+                f'{sum(times.values()):>9.2f}'
+            )
+        self.stdout.write(
+            f'django.setup() целиком: {result["setup"]["total"]:.2f} мс'
+        )
+        for step, elapsed in result.get('warm_up', {}).items():
+            self.stdout.write(f'warm_up {step:<10} {elapsed:>9.2f} мс')
@@ -0,0 +1,149 @@
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import db
+
+SCHEMA = '''
+CREATE TABLE post (id INTEGER PRIMARY KEY, comments_count INTEGER);
+CREATE TABLE comment (
+    id INTEGER PRIMARY KEY, post_id INTEGER, text TEXT, pub_date REAL
+);
+CREATE INDEX comment_post_pub_date ON comment (post_id, pub_date);
+'''
+POSTS = 100
+
+
+def _prepare(path):
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    connection.executemany(
+        'INSERT INTO post VALUES (?, 0)', [(n,) for n in range(POSTS)]
+    )
+    connection.commit()
+    connection.close()
+
+
+def _write(cursor, rng):
+    # Как add_comment: комментарий и счётчик поста в одной транзакции
+    post_id = rng.randrange(POSTS)
+    cursor.execute('BEGIN')
+    try:
+        cursor.execute(
+            'INSERT INTO comment (post_id, text, pub_date) VALUES (?, ?, ?)',
+            (post_id, 'x' * rng.randrange(20, 400), time.time())
+        )
+        cursor.execute(
+            'UPDATE post SET comments_count = comments_count + 1 '
+            'WHERE id = ?', (post_id,)
+        )
+        cursor.execute('COMMIT')
+    except sqlite3.OperationalError:
+        cursor.execute('ROLLBACK')
+        raise
+
+
+def _read(cursor, rng):
+    # Как post_detail: пост и первая страница комментариев
+    post_id = rng.randrange(POSTS)
+    cursor.execute('SELECT * FROM post WHERE id = ?', (post_id,)).fetchone()
+    cursor.execute(
+        'SELECT * FROM comment WHERE post_id = ? ORDER BY pub_date LIMIT 20',
+        (post_id,)
+    ).fetchall()
+
+
+def _worker(path, tuned, pragmas, seconds, write_share, seed, queue):
+    """Крутит смесь чтений и записей seconds секунд и возвращает счётчики.
+
+    tuned=False — настройки SQLite по умолчанию и ошибка при блокировке,
+    tuned=True — PRAGMA из SQLITE_PRAGMAS и повтор с паузой.
+    """
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+    cursor = connection.cursor()
+    if tuned:
+        db.apply_pragmas(cursor, pragmas)
+    reads = writes = errors = retries = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if rng.random() >= write_share:
+            _read(cursor, rng)
+            reads += 1
+            continue
+        for attempt in range(settings.DB_RETRY_ATTEMPTS if tuned else 1):
+            try:
+                _write(cursor, rng)
+            except sqlite3.OperationalError as error:
+                if not db.is_locked(error):
+                    raise
+                if tuned and attempt + 1 < settings.DB_RETRY_ATTEMPTS:
+                    retries += 1
+                    db.backoff(attempt)
+                    continue
+                errors += 1
+            else:
+                writes += 1
+            break
+    connection.close()
+    queue.put((reads, writes, errors, retries))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite с настройками по '
+        'умолчанию и с PRAGMA и повторами из core.db при конкурентной '
+        'записи из нескольких процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument(
+            '--write-share', type=float, default=0.2,
+            help='Доля записей среди операций'
+        )
+
+    def handle(self, *args, **options):
+        for tuned in (False, True):
+            reads, writes, errors, retries = self.run(tuned, **options)
+            seconds = options['seconds']
+            label = 'WAL и PRAGMA' if tuned else 'по умолчанию'
+            self.stdout.write(
+                f'{label:<14} {(reads + writes) / seconds:>9.0f} оп/с  '
+                f'чтений {reads / seconds:>8.0f}/с  '
+                f'записей {writes / seconds:>7.0f}/с  '
+                f'ошибок {errors:>5}  повторов {retries:>5}'
+            )
+
+    def run(self, tuned, workers, seconds, write_share, **options):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'benchmark.sqlite3')
+        try:
+            _prepare(path)
+            context = get_context('fork')
+            queue = context.Queue()
+            processes = [
+                context.Process(target=_worker, args=(
+                    path, tuned, settings.SQLITE_PRAGMAS, seconds,
+                    write_share, number, queue
+                ))
+                for number in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            totals = [sum(column) for column in zip(*(
+                queue.get() for _ in processes
+            ))]
+            for process in processes:
+                process.join()
+            return totals
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,344 @@
+import cProfile
+import io
+import json
+import logging
+import mimetypes
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse, HttpResponseNotModified
+from django.template.base import Template
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.utils.module_loading import import_string
+from django.views.static import was_modified_since
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from . import routers
+from .storage import variant_path
+
+logger = logging.getLogger('core.performance')
+
+_local = threading.local()
+_installed = False
+_install_lock = threading.Lock()
+
+
+class Metrics:
+    """Счётчики одного запроса."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+        self.thumbnail_time = 0.0
+        # Глубина вложенных вызовов: include внутри шаблона и get внутри
+        # get_many не должны считаться дважды
+        self.depth = {}
+
+    def enter(self, kind):
+        depth = self.depth.get(kind, 0)
+        self.depth[kind] = depth + 1
+        return depth == 0
+
+    def leave(self, kind):
+        self.depth[kind] -= 1
+
+
+def current():
+    """Счётчики запроса, который обрабатывается в этом потоке."""
+    return getattr(_local, 'metrics', None)
+
+
+def _timed(kind, attribute):
+    """Оборачивает метод: время верхнего вызова копится в attribute."""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            metrics = current()
+            if metrics is None:
+                return method(*args, **kwargs)
+            outer = metrics.enter(kind)
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                metrics.leave(kind)
+                if outer:
+                    setattr(metrics, attribute, getattr(metrics, attribute)
+                            + time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def _counted_get(method):
+    @wraps(method)
+    def wrapper(self, key, default=None, version=None):
+        metrics = current()
+        value = method(self, key, default=default, version=version)
+        if metrics is not None and metrics.depth.get('cache') == 1:
+            if value is default:
+                metrics.cache_misses += 1
+            else:
+                metrics.cache_hits += 1
+        return value
+    return wrapper
+
+
+def _counted_get_many(method):
+    @wraps(method)
+    def wrapper(self, keys, version=None):
+        keys = list(keys)
+        metrics = current()
+        found = method(self, keys, version=version)
+        if metrics is not None and metrics.depth.get('cache') == 1:
+            metrics.cache_hits += len(found)
+            metrics.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def _install():
+    """Один раз на процесс оборачивает рендер шаблонов, чтения кэша и
+    бэкенд миниатюр. Вне запроса обёртки сразу зовут исходный метод."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        Template.render = _timed('template', 'template_time')(
+            Template.render
+        )
+        backend = type(caches['default'])
+        backend.get = _timed('cache', 'cache_time')(
+            _counted_get(backend.get)
+        )
+        backend.get_many = _timed('cache', 'cache_time')(
+            _counted_get_many(backend.get_many)
+        )
+        thumbnails = import_string(thumbnail_settings.THUMBNAIL_BACKEND)
+        thumbnails.get_thumbnail = _timed('thumbnail', 'thumbnail_time')(
+            thumbnails.get_thumbnail
+        )
+        _installed = True
+
+
+def _sql_wrapper(metrics):
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.sql_count += 1
+            metrics.sql_time += time.perf_counter() - started
+    return wrapper
+
+
+class PerformanceMiddleware:
+    """Меряет SQL, шаблоны, кэш и миниатюры каждого запроса.
+
+    Итог уходит в заголовок Server-Timing и строкой JSON в логгер
+    core.performance. Включается настройкой PERFORMANCE_METRICS; вне
+    запроса обёртки стоят одного обращения к threading.local.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFORMANCE_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _install()
+
+    def __call__(self, request):
+        metrics = _local.metrics = Metrics()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                wrapper = _sql_wrapper(metrics)
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(wrapper))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        total = time.perf_counter() - started
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.sql_time * 1000:.1f};'
+            f'desc="{metrics.sql_count} queries"',
+            f'tpl;dur={metrics.template_time * 1000:.1f}',
+            f'cache;dur={metrics.cache_time * 1000:.1f};'
+            f'desc="{metrics.cache_hits} hits, '
+            f'{metrics.cache_misses} misses"',
+            f'thumb;dur={metrics.thumbnail_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'sql_count': metrics.sql_count,
+            'sql_ms': round(metrics.sql_time * 1000, 2),
+            'template_ms': round(metrics.template_time * 1000, 2),
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+            'cache_ms': round(metrics.cache_time * 1000, 2),
+            'thumbnail_ms': round(metrics.thumbnail_time * 1000, 2),
+        }))
+        return response
+
+
+class ProfilingMiddleware:
+    """Профилирует один запрос сотрудника по заголовку X-Profile или
+    параметру ?_profile.
+
+    cProfile и топ аллокаций tracemalloc пишутся в PROFILING_DIR, имя
+    дампа возвращается в заголовке X-Profile-Dump. Без флага стоит двух
+    поисков в словарях. tracemalloc общий на процесс, поэтому
+    одновременно профилируется только один запрос.
+    """
+
+    lock = threading.Lock()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (
+            'HTTP_X_PROFILE' in request.META or '_profile' in request.GET
+        ):
+            return self.get_response(request)
+        if not request.user.is_staff or not self.lock.acquire(False):
+            return self.get_response(request)
+        try:
+            return self.profile(request)
+        finally:
+            self.lock.release()
+
+    def profile(self, request):
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start(settings.PROFILING_FRAMES)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        name = self.dump(request, profiler, snapshot)
+        response['X-Profile-Dump'] = name
+        return response
+
+    def dump(self, request, profiler, snapshot):
+        """Сохраняет .prof для pstats/snakeviz и текстовый отчёт."""
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        slug = re.sub(r'[^\w-]+', '_', request.path).strip('_') or 'root'
+        name = (
+            f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-'
+            f'{request.method.lower()}-{slug[:80]}'
+        )
+        path = os.path.join(settings.PROFILING_DIR, name)
+        profiler.dump_stats(path + '.prof')
+        top = settings.PROFILING_TOP
+        report = io.StringIO()
+        report.write(f'{request.method} {request.get_full_path()}\n\n')
+        pstats.Stats(profiler, stream=report).sort_stats(
+            'cumulative'
+        ).print_stats(top)
+        report.write(f'Аллокации, топ {top}:\n')
+        for statistic in snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ]).statistics('lineno')[:top]:
+            report.write(f'{statistic}\n')
+        with open(path + '.txt', 'w', encoding='utf-8') as file:
+            file.write(report.getvalue())
+        return name
+
+
+class ReplicaPinMiddleware:
+    """Если запрос изменил данные страниц (core.routers.mark_written),
+    ставит cookie PIN_COOKIE: следующие REPLICA_PIN_SECONDS секунд
+    чтения клиента идут в основную базу и видят его запись (см.
+    core.routers.read_replica).
+
+    Смотрит на сами изменения, а не на метод: подписка и отписка
+    приходят GET-ссылками.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset_writes()
+        response = self.get_response(request)
+        if settings.DATABASE_REPLICAS and routers.has_written():
+            response.set_cookie(
+                routers.PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную collectstatic статику из STATIC_ROOT.
+
+    Клиенту, который принимает br или gzip, уходит заранее сжатая копия.
+    Файлы с хэшем в имени не меняются, поэтому кэшируются на год без
+    перепроверки; остальные браузер перепроверяет по Last-Modified.
+    """
+
+    hashed_name = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith(settings.STATIC_URL):
+            return self.get_response(request)
+        name = request.path[len(settings.STATIC_URL):]
+        try:
+            path, encoding = variant_path(
+                settings.STATIC_ROOT, name,
+                request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            )
+            stat = os.stat(path)
+        except (OSError, SuspiciousFileOperation):
+            return self.get_response(request)
+        immutable = self.hashed_name.search(name)
+        if not immutable and not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime, stat.st_size
+        ):
+            return HttpResponseNotModified()
+        content_type, _ = mimetypes.guess_type(name)
+        response = FileResponse(
+            open(path, 'rb'),
+            content_type=content_type or 'application/octet-stream',
+        )
+        if encoding:
+            response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if immutable:
+            patch_cache_control(
+                response, public=True, max_age=365 * 24 * 60 * 60,
+                immutable=True,
+            )
+        else:
+            response['Last-Modified'] = http_date(stat.st_mtime)
+            patch_cache_control(response, public=True, no_cache=True)
+        return response
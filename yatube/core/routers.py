@@ -0,0 +1,102 @@
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+# Cookie, с которой чтения клиента идут в основную базу: её ставит
+# core.middleware.ReplicaPinMiddleware после запроса, изменившего данные
+# страниц (см. mark_written)
+PIN_COOKIE = 'pin_primary'
+
+_local = threading.local()
+
+
+class ReplicaRouter:
+    """Отправляет чтения view с read_replica в реплику, всё остальное —
+    в default.
+
+    Реплики перечислены в DATABASE_REPLICAS; при пустом списке роутер
+    ничего не меняет.
+    """
+
+    def db_for_read(self, model, **hints):
+        return getattr(_local, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        # Явно: иначе объект, прочитанный из реплики, сохранился бы в неё
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема приходит на реплики вместе с данными
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def reset_writes():
+    """Начинает учёт записей нового запроса в этом потоке."""
+    _local.wrote = False
+
+
+def mark_written():
+    """Отмечает, что запрос изменил данные, которые видят читатели.
+
+    Вызывается там, где сбрасываются кэши страниц, а не на каждую
+    запись: служебные записи при чтении (ленивые счётчики, хранилище
+    миниатюр) не должны закреплять клиента за default.
+    """
+    _local.wrote = True
+
+
+def has_written():
+    """Изменил ли текущий запрос данные страниц."""
+    return getattr(_local, 'wrote', False)
+
+
+def reading_replica():
+    """Идут ли чтения текущего запроса в реплику."""
+    return getattr(_local, 'replica', None) is not None
+
+
+@contextmanager
+def primary():
+    """Направляет чтения блока в default.
+
+    Для того, что кладётся в кэш: отстающая реплика оставила бы там
+    устаревшие данные под уже новой версией.
+    """
+    previous = getattr(_local, 'replica', None)
+    _local.replica = None
+    try:
+        yield
+    finally:
+        _local.replica = previous
+
+
+def read_replica(view):
+    """Выполняет чтения view на случайной реплике.
+
+    Реплика выбирается одна на запрос, чтобы страница видела
+    согласованный снимок. Клиент с cookie PIN_COOKIE недавно писал и
+    читает из default, пока реплика не догнала его запись.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or PIN_COOKIE in request.COOKIES:
+            return view(request, *args, **kwargs)
+        previous = getattr(_local, 'replica', None)
+        _local.replica = random.choice(replicas)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _local.replica = previous
+    return wrapper
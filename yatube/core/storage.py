@@ -0,0 +1,84 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.utils._os import safe_join
+
+try:
+    import brotli
+except ImportError:
+    # Brotli есть в requirements.txt; в окружении без него
+    # собираются и отдаются только .gz
+    brotli = None
+
+# Что имеет смысл сжимать: картинки и шрифты уже сжаты
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+# Файлы меньше этого размера не сжимаем: выигрыш меньше заголовков
+MIN_SIZE = 512
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+
+def _compressors():
+    if brotli is not None:
+        yield '.br', lambda content: brotli.compress(content, quality=11)
+    yield '.gz', lambda content: gzip.compress(content, 9, mtime=0)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хэшем содержимого в имени и заранее сжатыми копиями.
+
+    collectstatic пишет css/bootstrap.min.<хэш>.css, staticfiles.json и
+    рядом .br и .gz (без пакета brotli — только .gz). Без собранной статики,
+    например в тестах с DEBUG = False, {% static %} отдаёт исходное имя
+    вместо ошибки.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Файла нет ни в манифесте, ни на диске
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            for variant in self.compress(name):
+                yield name, variant, True
+
+    def compress(self, name):
+        """Пишет сжатые копии файла, если они меньше оригинала."""
+        if not name.endswith(COMPRESSIBLE) or self.size(name) < MIN_SIZE:
+            return
+        with self.open(name) as file:
+            content = file.read()
+        for suffix, compress in _compressors():
+            compressed = compress(content)
+            if len(compressed) >= len(content):
+                continue
+            variant = name + suffix
+            if self.exists(variant):
+                self.delete(variant)
+            self._save(variant, ContentFile(compressed))
+            yield variant
+
+
+def variant_path(root, name, accept_encoding):
+    """Путь к лучшей сжатой копии, которую принимает клиент, и её
+    Content-Encoding; для несжатого файла — (путь, None). Путь вне root
+    вызывает SuspiciousFileOperation."""
+    path = safe_join(root, name)
+    accepted = set()
+    for part in accept_encoding.split(','):
+        encoding, *params = [item.strip() for item in part.split(';')]
+        if not any(param in ('q=0', 'q=0.0') for param in params):
+            accepted.add(encoding)
+    for encoding, suffix in ENCODINGS.items():
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
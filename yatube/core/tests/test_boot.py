@@ -0,0 +1,25 @@
+import gc
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from ..boot import warm_up
+
+
+class BootTest(SimpleTestCase):
+    def test_warm_up_reports_steps_and_freezes_gc(self):
+        self.addCleanup(gc.unfreeze)
+        timings = warm_up()
+        self.assertEqual(
+            list(timings), ['urls', 'templates', 'cache', 'thumbnails', 'gc']
+        )
+        self.assertGreater(gc.get_freeze_count(), 0)
+
+    def test_boot_profile_times_every_app(self):
+        out = StringIO()
+        call_command('boot_profile', stdout=out)
+        report = out.getvalue()
+        for label in ('posts', 'core', 'auth', 'thumbnail'):
+            self.assertRegex(report, rf'\n{label} +\d')
+        self.assertIn('django.setup()', report)
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import time
+from multiprocessing import get_context
+
+from django.test import SimpleTestCase
+
+from ..cache import SQLiteCache
+
+
+def _bump(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_values_are_shared_between_instances(self):
+        self.cache.set('page', {'html': 'Привет'})
+        self.cache.set('number', 41)
+        other = self.make_cache()
+        self.assertEqual(other.get('page'), {'html': 'Привет'})
+        self.assertEqual(other.incr('number'), 42)
+        self.assertEqual(self.cache.get('number'), 42)
+        self.assertEqual(
+            other.get_many(['page', 'missing']), {'page': {'html': 'Привет'}}
+        )
+        self.assertFalse(other.add('page', 'другое'))
+        self.assertTrue(other.delete('page'))
+        self.assertIsNone(self.cache.get('page'))
+
+    def test_expired_entries_are_not_returned(self):
+        self.cache.set('short', 'value', timeout=0.01)
+        self.cache.set('forever', 'value', timeout=None)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertFalse(self.cache.has_key('short'))
+        self.assertTrue(self.cache.add('short', 'again'))
+        self.assertEqual(self.cache.get('forever'), 'value')
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.make_cache(MAX_BYTES=11000, CULL_FREQUENCY=10)
+        cache.set('first', b'x' * 3000)
+        cache.set('second', b'x' * 3000)
+        # Чтение освежает запись, поэтому вытесняется second
+        db = cache._connection()
+        db.execute("UPDATE cache SET accessed = accessed - 100")
+        cache.get('first')
+        cache.set('third', b'x' * 3000)
+        cache.set('fourth', b'x' * 3000)
+        self.assertIsNotNone(cache.get('first'))
+        self.assertIsNone(cache.get('second'))
+        used, = db.execute('SELECT bytes FROM cache_stats').fetchone()
+        self.assertLessEqual(used, 9900)
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = get_context('fork')
+        workers = [
+            context.Process(target=_bump, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
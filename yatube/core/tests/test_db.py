@@ -0,0 +1,63 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase, override_settings
+
+from posts.models import Group
+
+from ..db import retry_on_locked
+
+
+@override_settings(DB_RETRY_DELAY=0)
+class SQLiteTuningTest(TransactionTestCase):
+    def test_pragmas_applied_to_new_connections(self):
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -64000)
+
+    def test_locked_write_is_retried_in_fresh_transaction(self):
+        calls = []
+
+        @retry_on_locked
+        def create():
+            calls.append(Group.objects.create(
+                title='Группа', slug=f'group-{len(calls)}', description='-'
+            ))
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+
+        create()
+        self.assertEqual(len(calls), 3)
+        # Первые две попытки откатились вместе со своими группами
+        self.assertEqual(
+            list(Group.objects.values_list('slug', flat=True)), ['group-2']
+        )
+
+    @override_settings(DB_RETRY_ATTEMPTS=2)
+    def test_gives_up_and_ignores_other_errors(self):
+        calls = []
+
+        @retry_on_locked
+        def fail(message):
+            calls.append(message)
+            raise OperationalError(message)
+
+        with self.assertRaises(OperationalError):
+            fail('database is locked')
+        with self.assertRaises(OperationalError):
+            fail('no such table: posts_post')
+        self.assertEqual(len(calls), 3)
+
+    def test_benchmark_reports_both_modes(self):
+        out = StringIO()
+        call_command(
+            'db_benchmark', workers=2, seconds=0.2, stdout=out
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('по умолчанию', lines[0])
+        self.assertIn('WAL', lines[1])
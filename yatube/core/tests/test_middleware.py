@@ -0,0 +1,93 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+def timings(response):
+    """Разбирает Server-Timing в словарь имя -> (длительность, описание)."""
+    result = {}
+    for name, duration, description in re.findall(
+        r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', response['Server-Timing']
+    ):
+        result[name] = (float(duration), description)
+    return result
+
+
+class PerformanceMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Denis')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('core.performance', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        metrics = timings(response)
+        self.assertEqual(
+            set(metrics), {'db', 'tpl', 'cache', 'thumb', 'total'}
+        )
+        self.assertRegex(metrics['db'][1], r'^[1-9]\d* queries$')
+        self.assertGreater(metrics['tpl'][0], 0)
+        self.assertLessEqual(metrics['tpl'][0], metrics['total'][0])
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['path'], reverse('posts:index'))
+        self.assertEqual(line['status'], 200)
+        self.assertGreater(line['cache_misses'], 0)
+
+    def test_cached_page_counts_hits(self):
+        self.client.get(reverse('posts:index'))
+        with self.assertLogs('core.performance', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertGreater(line['cache_hits'], 0)
+
+
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='Admin', is_staff=True)
+        cls.user = User.objects.create_user(username='Denis')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        override = override_settings(PROFILING_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_staff_request_is_profiled(self):
+        self.client.force_login(self.staff)
+        for kwargs in ({'data': {'_profile': 1}}, {'HTTP_X_PROFILE': '1'}):
+            with self.subTest(**kwargs):
+                response = self.client.get(reverse('posts:index'), **kwargs)
+                name = response['X-Profile-Dump']
+                path = os.path.join(self.directory, name)
+                self.assertTrue(os.path.getsize(path + '.prof'))
+                with open(path + '.txt', encoding='utf-8') as file:
+                    report = file.read()
+                self.assertIn('function calls', report)
+                self.assertIn('Аллокации', report)
+
+    def test_flag_is_ignored_for_others(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('posts:index'), {'_profile': 1}, HTTP_X_PROFILE='1'
+        )
+        self.assertNotIn('X-Profile-Dump', response)
+        self.assertEqual(os.listdir(self.directory), [])
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import follows
+from posts.models import Post
+
+from ..routers import PIN_COOKIE, ReplicaRouter
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Denis')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tables(self, alias, method, url, data=None):
+        """Выполняет запрос и возвращает SQL, ушедший в базу alias."""
+        with CaptureQueriesContext(connections[alias]) as queries:
+            response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, 400)
+        return ' '.join(query['sql'] for query in queries)
+
+    def test_read_views_use_replica(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                sql = self.tables('replica', 'get', url)
+                self.assertIn('"posts_post"', sql)
+
+    def test_reads_stick_to_primary_after_write(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        replica = self.tables('replica', 'post', reverse(
+            'posts:add_comment', kwargs={'post_id': self.post.id}
+        ), {'text': 'Комментарий'})
+        self.assertNotIn('INSERT', replica)
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+        self.assertEqual(self.tables('replica', 'get', url), '')
+        self.assertIn('"posts_comment"', self.tables('default', 'get', url))
+
+    def test_follow_by_get_pins_reads_to_primary(self):
+        author = User.objects.create_user(username='Julia')
+        profile = reverse('posts:profile', kwargs={'username': author})
+        self.tables('default', 'get', reverse(
+            'posts:profile_follow', kwargs={'username': author}
+        ))
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+        self.assertEqual(self.tables('replica', 'get', profile), '')
+        # И страница, и набор подписок в кэше уже знают о подписке
+        self.assertContains(self.client.get(profile), reverse(
+            'posts:profile_unfollow', kwargs={'username': author}
+        ))
+        self.assertIn(author.pk, follows.for_user(self.user.pk))
+
+    def test_service_writes_on_read_do_not_pin(self):
+        author = User.objects.create_user(username='Julia')
+        # Страница лениво создаёт счётчики автора, но данных не меняет
+        self.tables('replica', 'get', reverse(
+            'posts:profile', kwargs={'username': author}
+        ))
+        self.assertNotIn(PIN_COOKIE, self.client.cookies)
+
+    def test_caches_are_filled_from_primary(self):
+        index = reverse('posts:index')
+        Post.objects.create(author=self.user, text='Свежий')
+        # Версия только что сброшена: реплика могла не догнать запись
+        self.assertNotIn('"posts_post"', self.tables('replica', 'get', index))
+        cache.clear()
+        replica = self.tables('replica', 'get', reverse(
+            'posts:profile', kwargs={'username': self.user}
+        ))
+        self.assertIn('"posts_post"', replica)
+        # Набор подписок живёт в кэше сутки и читается только из default
+        self.assertNotIn('"posts_follow"', replica)
+
+    def test_objects_from_replica_are_saved_to_primary(self):
+        post = Post.objects.using('replica').get(pk=self.post.pk)
+        self.assertEqual(
+            ReplicaRouter().db_for_write(Post, instance=post), 'default'
+        )
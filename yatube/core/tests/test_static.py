@@ -0,0 +1,64 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+CSS = 'body { color: #212529; }\n' * 100
+
+
+class StaticPipelineTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        source = tempfile.mkdtemp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'bootstrap.min.css'), 'w') as f:
+            f.write(CSS)
+        override = override_settings(
+            STATICFILES_DIRS=[source], STATIC_ROOT=root
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_missing_static_falls_back_to_plain_names(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '/static/css/bootstrap.min.css')
+
+    def test_collected_files_are_hashed_and_precompressed(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        url = staticfiles_storage.url('css/bootstrap.min.css')
+        self.assertRegex(url, r'bootstrap\.min\.[0-9a-f]{12}\.css$')
+        self.assertContains(self.client.get(reverse('posts:index')), url)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body).decode(), CSS)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content).decode(), CSS)
+
+    def test_unhashed_names_are_revalidated(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        response = self.client.get('/static/css/bootstrap.min.css')
+        self.assertIn('no-cache', response['Cache-Control'])
+        response = self.client.get(
+            '/static/css/bootstrap.min.css',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(
+            self.client.get('/static/../manage.py').status_code, 404
+        )
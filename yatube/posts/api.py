@@ -0,0 +1,152 @@
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from .cache import cache_feed
+from .models import Comment, Group, Post, User
+from .utils import POST_NUMBER, CursorPaginator
+
+# Публичное имя поля -> выражение для .values()
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+}
+MAX_BATCH = 100
+JSON_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def _error(message, status=400):
+    return _json({'error': message}, status=status)
+
+
+def _selected(request, available):
+    """Разбирает ?fields=id,text. Без параметра отдаются все поля."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    names = [name for name in raw.split(',') if name]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise FieldsError(f'Неизвестные поля: {", ".join(unknown)}')
+    return names
+
+
+def _values(queryset, names, available):
+    # pub_date и id нужны курсору, даже если клиент их не просил
+    lookups = {available[name] for name in names} | {'pub_date', 'id'}
+    return queryset.values(*lookups)
+
+
+def _serialize(row, names, available):
+    item = {name: row[available[name]] for name in names}
+    if item.get('image'):
+        item['image'] = default_storage.url(item['image'])
+    elif 'image' in item:
+        item['image'] = None
+    return item
+
+
+def _page(request, queryset, available, descending=True):
+    names = _selected(request, available)
+    paginator = CursorPaginator(
+        _values(queryset, names, available), POST_NUMBER,
+        descending=descending
+    )
+    page = paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return _json({
+        'results': [_serialize(row, names, available) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def _feed(request, queryset):
+    try:
+        return _page(request, queryset, POST_FIELDS)
+    except FieldsError as error:
+        return _error(str(error))
+
+
+@cache_feed('index')
+def posts(request):
+    return _feed(request, Post.objects.all())
+
+
+@cache_feed('group:{slug}')
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _feed(request, Post.objects.filter(group=group))
+
+
+@cache_feed('profile:{username}')
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return _feed(request, Post.objects.filter(author=author))
+
+
+def post_detail(request, post_id):
+    try:
+        names = _selected(request, POST_FIELDS)
+    except FieldsError as error:
+        return _error(str(error))
+    row = _values(Post.objects.filter(pk=post_id), names, POST_FIELDS).first()
+    if row is None:
+        return _error('Пост не найден', status=404)
+    return _json(_serialize(row, names, POST_FIELDS))
+
+
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('id'), pk=post_id)
+    try:
+        return _page(
+            request, Comment.objects.filter(post_id=post_id),
+            COMMENT_FIELDS, descending=False
+        )
+    except FieldsError as error:
+        return _error(str(error))
+
+
+def posts_batch(request):
+    """Отдаёт посты по ?ids=1,2,3 в порядке запроса одним запросом к БД."""
+    try:
+        ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk]
+        names = _selected(request, POST_FIELDS)
+    except FieldsError as error:
+        return _error(str(error))
+    except ValueError:
+        return _error('ids должен быть списком чисел через запятую')
+    if len(ids) > MAX_BATCH:
+        return _error(f'Не больше {MAX_BATCH} id за запрос')
+    rows = {
+        row['id']: row
+        for row in _values(Post.objects.filter(pk__in=ids), names, POST_FIELDS)
+    }
+    return _json({
+        'results': [
+            _serialize(rows[pk], names, POST_FIELDS)
+            for pk in dict.fromkeys(ids) if pk in rows
+        ],
+    })
@@ -0,0 +1,134 @@
+import math
+import random
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from .models import Follow, Group, Post, User
+
+PERCENTILES = (50, 95, 99)
+
+
+def _routes(sample):
+    """Маршруты posts.urls: (имя, метод, URL, данные формы)."""
+    post, group, author = sample['post'], sample['group'], sample['author']
+    return [
+        ('index', 'get', reverse('posts:index'), None),
+        ('group_list', 'get',
+         reverse('posts:group_list', kwargs={'slug': group.slug}), None),
+        ('profile', 'get',
+         reverse('posts:profile', kwargs={'username': author.username}),
+         None),
+        ('post_detail', 'get',
+         reverse('posts:post_detail', kwargs={'post_id': post.id}), None),
+        ('search', 'get', reverse('posts:search'), {'q': 'пост'}),
+        ('follow_index', 'get', reverse('posts:follow_index'), None),
+        ('post_create', 'post', reverse('posts:post_create'),
+         {'text': 'Пост из бенчмарка'}),
+        ('add_comment', 'post',
+         reverse('posts:add_comment', kwargs={'post_id': post.id}),
+         {'text': 'Комментарий из бенчмарка'}),
+    ]
+
+
+def _sample(seed):
+    """Выбирает читателя с подписками, популярного автора, группу и пост."""
+    rng = random.Random(seed)
+    follows = Follow.objects.values_list('user_id', flat=True)
+    reader = User.objects.get(pk=rng.choice(list(follows[:1000])))
+    author = User.objects.order_by('-counters__followers_count').first()
+    group = Group.objects.order_by('-posts_count').first()
+    post = Post.objects.order_by('-comments_count').first()
+    return {'reader': reader, 'author': author, 'group': group, 'post': post}
+
+
+@contextmanager
+def _count_queries(counter):
+    def wrapper(execute, sql, params, many, context):
+        counter[0] += 1
+        return execute(sql, params, many, context)
+    with connection.execute_wrapper(wrapper):
+        yield
+
+
+def percentile(values, rank):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(math.ceil(rank / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def summarize(timings, queries, sizes):
+    summary = {
+        f'p{rank}_ms': round(percentile(timings, rank) * 1000, 3)
+        for rank in PERCENTILES
+    }
+    summary['mean_ms'] = round(sum(timings) / len(timings) * 1000, 3)
+    summary['queries'] = round(sum(queries) / len(queries), 2)
+    summary['bytes'] = round(sum(sizes) / len(sizes))
+    return summary
+
+
+def run(requests=50, warmup=3, seed=0, cold=False, routes=None):
+    """Прогоняет маршруты через тестовый клиент на текущей базе.
+
+    Для каждого маршрута возвращает перцентили задержки, среднее число
+    SQL-запросов и байт в ответе. cold=True очищает кэш перед каждым
+    запросом и меряет полный рендер.
+    """
+    sample = _sample(seed)
+    client = Client()
+    client.force_login(sample['reader'])
+    results = {}
+    for name, method, url, data in _routes(sample):
+        if routes and name not in routes:
+            continue
+        timings, queries, sizes = [], [], []
+        for number in range(warmup + requests):
+            if cold:
+                cache.clear()
+            counter = [0]
+            with _count_queries(counter):
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise RuntimeError(
+                    f'{name}: {url} ответил {response.status_code}'
+                )
+            if number < warmup:
+                continue
+            timings.append(elapsed)
+            queries.append(counter[0])
+            sizes.append(
+                0 if response.streaming else len(response.content)
+            )
+        results[name] = summarize(timings, queries, sizes)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Сравнивает p95 с базовым прогоном.
+
+    Возвращает строки отчёта и список регрессий хуже threshold (доля).
+    """
+    lines, regressions = [], []
+    for size, routes in results.items():
+        for name, current in routes.items():
+            before = baseline.get(size, {}).get(name)
+            if not before:
+                continue
+            change = current['p95_ms'] / max(before['p95_ms'], 1e-6) - 1
+            line = (
+                f'{size:>9} {name:<14} p95 {before["p95_ms"]:>9.2f} -> '
+                f'{current["p95_ms"]:>9.2f} мс ({change:+.0%}), '
+                f'запросов {before["queries"]} -> {current["queries"]}'
+            )
+            lines.append(line)
+            if change > threshold or current['queries'] > before['queries']:
+                regressions.append(line)
+    return lines, regressions
@@ -0,0 +1,158 @@
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.cache import cache_page
+
+from core import routers
+
+from . import thumbnails
+
+VERSION_KEY = 'feed-version:{}'
+BUMPED_KEY = 'feed-bumped:{}'
+# Автор и группа, которые выводятся рядом с постом. Их переименование
+# или удаление группы через SET NULL не меняет post.updated.
+SHOWN_FIELDS = (
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__slug', 'group__title',
+)
+
+
+def _key(scope, template=VERSION_KEY):
+    # slug и username могут содержать не-ASCII символы
+    return template.format(quote(scope))
+
+
+def _fresh_version():
+    # Версия из времени, а не с единицы: если ключ вытеснили из кэша,
+    # новая версия не совпадёт со старыми закэшированными страницами.
+    return int(time.time() * 1000)
+
+
+def get_versions(scopes):
+    """Возвращает строку из текущих версий перечисленных лент."""
+    keys = [_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _fresh_version(), None)
+            versions[key] = cache.get(key)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = _key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), None)
+    cache.set_many(
+        {_key(scope, BUMPED_KEY): True for scope in scopes},
+        settings.REPLICA_PIN_SECONDS
+    )
+
+
+def recently_bumped(scopes):
+    """Сбрасывалась ли версия лент за последние REPLICA_PIN_SECONDS."""
+    return bool(cache.get_many([_key(scope, BUMPED_KEY) for scope in scopes]))
+
+
+def bump(*scopes):
+    """Инвалидирует закэшированные страницы перечисленных лент."""
+    routers.mark_written()
+    _bump(scopes)
+    if transaction.get_connection().in_atomic_block:
+        # Повторяем после коммита, чтобы конкурентный запрос не успел
+        # закэшировать ещё не закоммиченное состояние под новой версией.
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def shown_values(post):
+    """Значения SHOWN_FIELDS для загруженного поста."""
+    values = []
+    for path in SHOWN_FIELDS:
+        value = post
+        for name in path.split('__'):
+            value = None if value is None else getattr(value, name)
+        values.append(value)
+    return values
+
+
+def shown_digest(values):
+    """Хэш значений SHOWN_FIELDS для ключей фрагментов и ETag."""
+    raw = '\0'.join(value or '' for value in values)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def make_etag(request, *parts):
+    """ETag страницы из переданных частей, пользователя и параметров."""
+    raw = ':'.join(
+        str(part)
+        for part in (*parts, request.user.pk, request.GET.urlencode())
+    )
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def cache_feed(*scopes):
+    """Кэширует страницу ленты до изменения её версии.
+
+    scopes — шаблоны имён лент, подставляются аргументы view:
+    'index', 'group:{slug}', 'profile:{username}'. Из тех же версий
+    строится ETag, поэтому повторный GET без изменений получает 304,
+    не обращаясь ни к БД, ни к закэшированной странице.
+    """
+    def decorator(view):
+        @wraps(view)
+        def render(request, *args, **kwargs):
+            fallbacks = thumbnails.fallbacks()
+            response = view(request, *args, **kwargs)
+            if thumbnails.fallbacks() != fallbacks:
+                # Миниатюра ещё не готова: cache_page не сохраняет
+                # private-ответы, страница с оригиналом не застрянет
+                # в кэше до смены версии
+                patch_cache_control(response, private=True)
+            return response
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            names = [scope.format(**kwargs) for scope in scopes]
+            if request.user.is_authenticated:
+                # Кнопки подписки на странице зависят от подписок читателя
+                names.append(f'following:{request.user.pk}')
+            versions = get_versions(names)
+            etag = None
+            if request.method in ('GET', 'HEAD'):
+                etag = make_etag(request, versions)
+                not_modified = get_conditional_response(request, etag=etag)
+                if not_modified is not None:
+                    return not_modified
+            # В странице меню и кнопки подписки читателя, а версии
+            # following:<pk> разных читателей могут совпасть
+            cached_view = cache_page(
+                settings.FEED_CACHE_TIMEOUT,
+                key_prefix=f'feed.{request.user.pk}.{versions}'
+            )(render)
+            if routers.reading_replica() and recently_bumped(names):
+                # Реплика могла ещё не получить запись, сбросившую версию:
+                # страница из неё осталась бы в кэше под новой версией
+                with routers.primary():
+                    response = cached_view(request, *args, **kwargs)
+            else:
+                response = cached_view(request, *args, **kwargs)
+            private = 'private' in response.get('Cache-Control', '')
+            if etag and response.status_code == 200 and not private:
+                response['ETag'] = etag
+                # Клиенты должны перепроверять страницу по ETag, а не
+                # держать её FEED_CACHE_TIMEOUT секунд, как велит cache_page
+                del response['Expires']
+                patch_cache_control(response, no_cache=True, max_age=0)
+            return response
+        return wrapper
+    return decorator
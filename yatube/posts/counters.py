@@ -0,0 +1,115 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.db import BULK_BATCH_SIZE
+
+from .models import Comment, Follow, Group, Post, User, UserCounter
+
+
+def _count(queryset, field):
+    """Подзапрос COUNT(*) по внешнему ключу field для UPDATE ... SET."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def _fix(queryset, **expressions):
+    """Обновляет только строки, где счётчик разошёлся с фактом."""
+    fixed = 0
+    for field, expression in expressions.items():
+        fixed += queryset.exclude(
+            **{field: expression}
+        ).update(**{field: expression})
+    return fixed
+
+
+def _only(queryset, pks):
+    # pks — список или подзапрос id; None — все строки
+    return queryset if pks is None else queryset.filter(pk__in=pks)
+
+
+def reconcile_groups(pks=None):
+    return _fix(
+        _only(Group.objects.all(), pks),
+        posts_count=_count(Post.objects.all(), 'group')
+    )
+
+
+def reconcile_posts(pks=None):
+    return _fix(
+        _only(Post.objects.all(), pks),
+        comments_count=_count(Comment.objects.all(), 'post')
+    )
+
+
+def reconcile_users(pks=None):
+    existing = UserCounter.objects.values('pk')
+    UserCounter.objects.bulk_create(
+        [
+            UserCounter(user_id=pk)
+            for pk in _only(User.objects.all(), pks).exclude(
+                pk__in=existing
+            ).values_list('pk', flat=True).iterator()
+        ],
+        batch_size=BULK_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    counters = UserCounter.objects.all()
+    if pks is not None:
+        counters = counters.filter(user__in=pks)
+    return _fix(
+        counters,
+        posts_count=_count(Post.objects.all(), 'author'),
+        followers_count=_count(Follow.objects.all(), 'author'),
+        following_count=_count(Follow.objects.all(), 'user'),
+    )
+
+
+def for_user(user_id):
+    """Возвращает счётчики пользователя, создавая их при первом обращении."""
+    counter = UserCounter.objects.filter(user_id=user_id).first()
+    if counter is None:
+        counter, _ = UserCounter.objects.get_or_create(
+            user_id=user_id,
+            defaults={
+                'posts_count': Post.objects.filter(author_id=user_id).count(),
+                'followers_count': Follow.objects.filter(
+                    author_id=user_id
+                ).count(),
+                'following_count': Follow.objects.filter(
+                    user_id=user_id
+                ).count(),
+            }
+        )
+    return counter
+
+
+def _bump(queryset, field, delta):
+    if delta < 0:
+        # Не уводим счётчик в минус, если он уже разошёлся с фактом
+        queryset = queryset.filter(**{f'{field}__gt': 0})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def bump_user(user_id, field, delta):
+    updated = _bump(UserCounter.objects.filter(user_id=user_id), field, delta)
+    if not updated and delta > 0:
+        # Строки ещё нет: считаем все счётчики пользователя с нуля,
+        # текущее изменение уже попало в базу.
+        for_user(user_id)
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        _bump(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def bump_post(post_id, delta):
+    _bump(Post.objects.filter(pk=post_id), 'comments_count', delta)
@@ -0,0 +1,283 @@
+import math
+import random
+from array import array
+from bisect import bisect
+from datetime import date, datetime, time, timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from . import bulk
+from .models import Comment, Follow, Group, Post, User
+
+PERIOD = timedelta(days=3 * 365)
+# День, к полуночи которого привязаны даты: от текущей даты данные
+# одного seed менялись бы день ото дня
+ANCHOR = date(2021, 1, 1)
+# Показатель степенного закона популярности авторов и размеров групп
+ZIPF_EXPONENT = 1.1
+# Доля постов без группы и доля постов с картинкой
+NO_GROUP_SHARE = 0.3
+IMAGE_SHARE = 0.2
+# Медиана и разброс длины поста в словах (логнормальное распределение)
+POST_WORDS_MEDIAN = 40
+POST_WORDS_SIGMA = 1.0
+COMMENT_WORDS_MEDIAN = 12
+# Размер пулов имён и слов: Faker медленный, миллионы строк собираются
+# из заранее сгенерированных кусочков
+NAME_POOL = 1000
+VOCABULARY = 3000
+
+
+def scaled(posts):
+    """Пропорции набора данных по числу постов, как у benchmark."""
+    return {
+        'users': max(posts // 10, 2),
+        'posts': posts,
+        'comments': posts * 2,
+        'groups': max(posts // 500, 1),
+        'follows': 10,
+        'images': 0,
+    }
+
+
+def _batches(objects, size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _zipf_weights(count):
+    """Накопленные веса рангов 1..count: несколько очень популярных
+    элементов и длинный хвост."""
+    return list(accumulate(
+        1 / rank ** ZIPF_EXPONENT for rank in range(1, count + 1)
+    ))
+
+
+class Generator:
+    """Генерирует правдоподобный набор данных и пишет его bulk_create.
+
+    Популярность авторов подчиняется степенному закону: на первых по
+    рангу подписано большинство пользователей, и их посты собирают
+    больше комментариев. Размеры групп тоже степенные, длина
+    текстов логнормальная, свежих постов больше, чем старых. Один и тот
+    же seed и anchor дают одинаковые данные: все даты укладываются в
+    PERIOD до полуночи anchor.
+    """
+
+    def __init__(self, seed=0, batch_size=5000, progress=None,
+                 anchor=ANCHOR):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(seed)
+        self.batch_size = batch_size
+        self.progress = progress or (lambda model, total: None)
+        self.now = datetime.combine(anchor, time.min, tzinfo=timezone.utc)
+        self.words = self.faker.words(VOCABULARY)
+
+    def create(self, model, objects, ids=True, **kwargs):
+        """Пишет объекты пачками, возвращает id созданных строк по
+        порядку создания."""
+        last_id = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        total = 0
+        for batch in _batches(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, **kwargs)
+            total += len(batch)
+            self.progress(model, total)
+        if not ids:
+            return None
+        return list(
+            model.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+    def text(self, median, sentences=True):
+        length = max(1, int(self.rng.lognormvariate(
+            math.log(median), POST_WORDS_SIGMA
+        )))
+        words = self.rng.choices(self.words, k=length)
+        if not sentences:
+            return ' '.join(words)
+        parts = []
+        for start in range(0, length, 12):
+            sentence = ' '.join(words[start:start + 12])
+            parts.append(sentence[:1].upper() + sentence[1:] + '.')
+        return ' '.join(parts)
+
+    def date(self):
+        # Квадрат равномерной величины сдвигает даты к настоящему
+        return self.now - PERIOD * self.rng.random() ** 2
+
+    def users(self, count):
+        first_names = [self.faker.first_name() for _ in range(NAME_POOL)]
+        last_names = [self.faker.last_name() for _ in range(NAME_POOL)]
+        logins = [self.faker.user_name() for _ in range(NAME_POOL)]
+        password = make_password(None)
+        return self.create(User, (
+            User(
+                username=f'{self.rng.choice(logins)}_{self.seed}_{n}',
+                first_name=self.rng.choice(first_names),
+                last_name=self.rng.choice(last_names),
+                password=password,
+                date_joined=self.date(),
+            )
+            for n in range(count)
+        ), ignore_conflicts=True)
+
+    def groups(self, count):
+        return self.create(Group, (
+            Group(
+                title=' '.join(self.rng.sample(self.words, 2)).capitalize(),
+                slug=f'group-{self.seed}-{n}',
+                description=self.text(POST_WORDS_MEDIAN),
+            )
+            for n in range(count)
+        ), ignore_conflicts=True)
+
+    def images(self, count):
+        """Пул картинок в хранилище: посты ссылаются на них повторно."""
+        names = []
+        for number in range(count):
+            image = Image.new('RGB', (1280, 853), self._color())
+            draw = ImageDraw.Draw(image)
+            for _ in range(12):
+                x, y = self.rng.randrange(1280), self.rng.randrange(853)
+                size = self.rng.randrange(40, 400)
+                draw.ellipse((x, y, x + size, y + size), fill=self._color())
+            content = BytesIO()
+            image.save(content, 'JPEG', quality=85)
+            names.append(default_storage.save(
+                f'posts/dataset-{self.seed}-{number}.jpg',
+                ContentFile(content.getvalue())
+            ))
+        return names
+
+    def _color(self):
+        return tuple(self.rng.randrange(256) for _ in range(3))
+
+    def posts(self, count, user_ids, group_ids, images):
+        # Активность авторов тоже степенная, но не совпадает с числом
+        # подписчиков: самые плодовитые авторы не обязательно знамениты
+        activity = _zipf_weights(len(user_ids))
+        writers = list(range(len(user_ids)))
+        self.rng.shuffle(writers)
+        group_weights = _zipf_weights(len(group_ids)) if group_ids else None
+        self.post_weights = array('d')
+        self.post_dates = array('d')
+
+        def make_post():
+            rank = bisect(activity, self.rng.random() * activity[-1])
+            index = writers[min(rank, len(writers) - 1)]
+            group_id = None
+            if group_weights and self.rng.random() > NO_GROUP_SHARE:
+                group_id = self.rng.choices(
+                    group_ids, cum_weights=group_weights
+                )[0]
+            image = None
+            if images and self.rng.random() < IMAGE_SHARE:
+                image = self.rng.choice(images)
+            pub_date = self.date()
+            self.post_weights.append(1 / (index + 1) ** ZIPF_EXPONENT)
+            self.post_dates.append(pub_date.timestamp())
+            return Post(
+                text=self.text(POST_WORDS_MEDIAN),
+                author_id=user_ids[index],
+                group_id=group_id,
+                image=image,
+                pub_date=pub_date,
+                created=pub_date,
+                updated=pub_date,
+            )
+        return self.create(Post, (make_post() for _ in range(count)))
+
+    def comments(self, count, user_ids, post_ids):
+        # Посты популярных авторов комментируют чаще
+        weights = list(accumulate(self.post_weights))
+        now = self.now.timestamp()
+
+        def make_comment():
+            index = bisect(weights, self.rng.random() * weights[-1])
+            index = min(index, len(post_ids) - 1)
+            posted = self.post_dates[index]
+            moment = posted + (now - posted) * self.rng.random() ** 4
+            return Comment(
+                post_id=post_ids[index],
+                author_id=self.rng.choice(user_ids),
+                text=self.text(COMMENT_WORDS_MEDIAN),
+                pub_date=datetime.fromtimestamp(moment, tz=timezone.utc),
+            )
+        self.create(
+            Comment, (make_comment() for _ in range(count)), ids=False
+        )
+
+    def follows(self, mean, user_ids):
+        popularity = _zipf_weights(len(user_ids))
+        # Распределение Парето с показателем 1.5 имеет среднее 3
+        scale = mean / 3
+
+        def make_follows():
+            for user_id in user_ids:
+                count = min(
+                    int(self.rng.paretovariate(1.5) * scale),
+                    len(user_ids) - 1
+                )
+                authors = set(self.rng.choices(
+                    user_ids, cum_weights=popularity, k=count
+                ))
+                authors.discard(user_id)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+        self.create(Follow, make_follows(), ids=False, ignore_conflicts=True)
+
+    def check_seed(self):
+        """Имена пользователей и slug групп содержат seed: повторный
+        прогон с тем же seed упёрся бы в уже созданные строки."""
+        used = (
+            User.objects.filter(username__regex=rf'_{self.seed}_[0-9]+$')
+            .exists()
+            or Group.objects.filter(slug__startswith=f'group-{self.seed}-')
+            .exists()
+        )
+        if used:
+            raise ValueError(
+                f'Набор с seed {self.seed} уже загружен, укажите другой seed'
+            )
+
+    def generate(self, users, posts, comments, groups, follows, images=0):
+        self.check_seed()
+        with bulk.keep_dates():
+            user_ids = self.users(users)
+            group_ids = self.groups(groups)
+            image_names = self.images(images)
+            post_ids = self.posts(posts, user_ids, group_ids, image_names)
+            if post_ids:
+                self.comments(comments, user_ids, post_ids)
+            self.follows(follows, user_ids)
+        return user_ids, post_ids
+
+
+def generate(users, posts, comments, groups, follows, images=0, seed=0,
+             batch_size=5000, progress=None, rebuild=True, anchor=ANCHOR):
+    """Создаёт набор данных и пересобирает ленты, счётчики и поиск."""
+    generator = Generator(seed, batch_size, progress, anchor)
+    ids = generator.generate(users, posts, comments, groups, follows, images)
+    if rebuild:
+        with transaction.atomic():
+            bulk.rebuild_derived()
+    return ids
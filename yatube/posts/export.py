@@ -0,0 +1,91 @@
+import json
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Post
+
+CHUNK_SIZE = 64 * 1024
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'group__slug', 'image')
+COMMENT_FIELDS = ('id', 'post_id', 'text', 'pub_date')
+
+
+def _line(kind, values):
+    values['type'] = kind
+    return json.dumps(
+        values, cls=DjangoJSONEncoder, ensure_ascii=False
+    ).encode() + b'\n'
+
+
+def iter_posts(author):
+    posts = Post.objects.filter(author=author).order_by('id')
+    for values in posts.values(*POST_FIELDS).iterator():
+        yield _line('post', values)
+
+
+def iter_comments(author):
+    comments = Comment.objects.filter(author=author).order_by('id')
+    for values in comments.values(*COMMENT_FIELDS).iterator():
+        yield _line('comment', values)
+
+
+class _Sink:
+    """Несматываемый поток для ZipFile, из которого забирают готовые байты.
+
+    У него нет tell() и seek(), поэтому zipfile пишет записи с data
+    descriptor'ами и никогда не возвращается назад — архив можно отдавать
+    по мере записи.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self, force=False):
+        if self.size < CHUNK_SIZE and not (force and self.size):
+            return
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        yield data
+
+
+def stream_archive(author):
+    """Отдаёт ZIP-архив автора кусками: NDJSON постов, комментариев и
+    картинки по одной, так что память не растёт с размером архива.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, lines in (
+            ('posts.ndjson', iter_posts(author)),
+            ('comments.ndjson', iter_comments(author)),
+        ):
+            with archive.open(name, 'w', force_zip64=True) as entry:
+                for line in lines:
+                    entry.write(line)
+                    yield from sink.drain()
+        images = Post.objects.filter(author=author).exclude(
+            image=''
+        ).exclude(image=None).order_by('id').values_list('image', flat=True)
+        for name in images.iterator():
+            if not default_storage.exists(name):
+                continue
+            # JPEG уже сжат, поэтому картинки кладём без компрессии
+            info = zipfile.ZipInfo(f'images/{name}')
+            info.compress_type = zipfile.ZIP_STORED
+            with default_storage.open(name) as source, \
+                    archive.open(info, 'w', force_zip64=True) as entry:
+                for chunk in source.chunks(CHUNK_SIZE):
+                    entry.write(chunk)
+                    yield from sink.drain()
+    yield from sink.drain(force=True)
@@ -0,0 +1,63 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core import routers
+
+from .models import Follow
+
+KEY = 'following-ids:{}'
+
+
+class FollowingSet:
+    """Отсортированный массив id авторов, на которых подписан
+    пользователь. Проверка «подписан ли» — двоичный поиск в памяти."""
+
+    def __init__(self, ids=()):
+        self.ids = array('q', ids)
+
+    def __contains__(self, author_id):
+        index = bisect_left(self.ids, author_id)
+        return index < len(self.ids) and self.ids[index] == author_id
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def for_user(user_id):
+    """Подписки пользователя из кэша; при промахе — один запрос к БД."""
+    if user_id is None:
+        return FollowingSet()
+    key = KEY.format(user_id)
+    raw = cache.get(key)
+    if raw is not None:
+        following = FollowingSet()
+        following.ids.frombytes(raw)
+        return following
+    # Сортируем в Python: ORDER BY в SQLite строил бы временное B-дерево.
+    # Читаем из default: набор живёт в кэше сутки, а реплика могла ещё
+    # не получить только что сделанную подписку.
+    with routers.primary():
+        following = FollowingSet(sorted(
+            Follow.objects.filter(user_id=user_id)
+            .values_list('author_id', flat=True)
+        ))
+    cache.set(key, following.ids.tobytes(), settings.FOLLOWING_CACHE_TIMEOUT)
+    return following
+
+
+def invalidate(user_id):
+    """Сбрасывает подписки пользователя после подписки или отписки."""
+    routers.mark_written()
+    key = KEY.format(user_id)
+    cache.delete(key)
+    if transaction.get_connection().in_atomic_block:
+        # Конкурентный запрос мог успеть закэшировать незакоммиченное
+        # состояние, как в posts.cache.bump
+        transaction.on_commit(lambda: cache.delete(key))
@@ -1,4 +1,6 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from .images import normalize
 from .models import Post, Comment
 
 
@@ -15,6 +17,13 @@ class PostForm(forms.ModelForm):
             'group': ' Группа, к которой будет относиться пост',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Пережимаем только новые загрузки, а не уже сохранённый файл
+        if isinstance(image, UploadedFile):
+            return normalize(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,88 @@
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageOps
+
+CONTENT_TYPES = {
+    'JPEG': ('image/jpeg', '.jpg'),
+    'WEBP': ('image/webp', '.webp'),
+    'PNG': ('image/png', '.png'),
+}
+
+
+def _flatten(image, image_format):
+    """Приводит режим картинки к поддерживаемому целевым форматом."""
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    if image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA')
+    return image
+
+
+def _color_space(mode):
+    # Альфа-канал не меняет пространство, к которому относится профиль
+    return {'RGBA': 'RGB', 'RGBX': 'RGB', 'LA': 'L'}.get(mode, mode)
+
+
+def normalize(upload):
+    """Готовит загруженную картинку к хранению.
+
+    Уменьшает до IMAGE_UPLOAD_MAX_SIZE, поворачивает по EXIF, выбрасывает
+    метаданные и пережимает в IMAGE_UPLOAD_FORMAT. JPEG декодируется сразу
+    в уменьшенном масштабе, а результат пишется во временный файл, который
+    уходит на диск после IMAGE_UPLOAD_SPOOL_SIZE байт.
+    """
+    max_size = settings.IMAGE_UPLOAD_MAX_SIZE
+    image_format = settings.IMAGE_UPLOAD_FORMAT
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+        if getattr(image, 'is_animated', False):
+            # Анимацию пережатие в статичный формат испортит
+            upload.seek(0)
+            return upload
+        icc_profile = image.info.get('icc_profile')
+        image.draft('RGB', max_size)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(max_size, Image.LANCZOS)
+        source_mode = image.mode
+        image = _flatten(image, image_format)
+        if _color_space(image.mode) != _color_space(source_mode):
+            # Профиль описывает исходное пространство (CMYK, L): в RGB-файле
+            # он исказит цвета
+            icc_profile = None
+
+        content_type, extension = CONTENT_TYPES[image_format]
+        output = SpooledTemporaryFile(
+            max_size=settings.IMAGE_UPLOAD_SPOOL_SIZE
+        )
+        options = {
+            'quality': settings.IMAGE_UPLOAD_QUALITY,
+            'optimize': True,
+        }
+        if image_format == 'JPEG':
+            options['progressive'] = True
+        if icc_profile:
+            options['icc_profile'] = icc_profile
+        image.save(output, image_format, **options)
+        image.close()
+    except (OSError, Image.DecompressionBombError) as error:
+        # verify() в ImageField не декодирует пиксели: обрезанный или
+        # слишком большой файл обнаруживается только здесь
+        raise ValidationError(
+            'Не удалось обработать изображение: файл повреждён '
+            'или слишком велик.',
+            code='invalid_image',
+        ) from error
+    size = output.tell()
+    output.seek(0)
+    name = os.path.splitext(os.path.basename(upload.name))[0] + extension
+    return UploadedFile(
+        file=output, name=name, content_type=content_type, size=size
+    )
@@ -0,0 +1,118 @@
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+
+from posts import benchmark, dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Меряет задержку, число запросов и размер ответа маршрутов posts '
+        'на тестовой базе заданных размеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1000,10000',
+            help='Размеры набора данных в постах через запятую'
+        )
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом'
+        )
+        parser.add_argument(
+            '--routes', help='Только эти маршруты через запятую'
+        )
+        parser.add_argument('--output', help='Куда записать JSON')
+        parser.add_argument('--baseline', help='JSON прошлого прогона')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост p95 относительно базового прогона'
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        routes = options['routes'] and options['routes'].split(',')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+
+        # Тестовая база и отдельный файл кэша: прогон не должен ни трогать
+        # рабочие данные, ни оставлять в общем кэше чужие страницы.
+        directory = tempfile.mkdtemp()
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        results = {}
+        try:
+            with override_settings(
+                CACHES={'default': {
+                    'BACKEND': 'core.cache.SQLiteCache',
+                    'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+                }},
+                MEDIA_ROOT=directory,
+                THUMBNAIL_WORKERS=0,
+            ):
+                for size in sizes:
+                    call_command('flush', interactive=False, verbosity=0)
+                    dataset.generate(
+                        **dataset.scaled(size), seed=options['seed']
+                    )
+                    results[str(size)] = benchmark.run(
+                        requests=options['requests'],
+                        warmup=options['warmup'],
+                        seed=options['seed'],
+                        cold=options['cold'],
+                        routes=routes,
+                    )
+                    self.report(size, results[str(size)])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(directory, ignore_errors=True)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'meta': {
+                        'requests': options['requests'],
+                        'cold': options['cold'],
+                        'seed': options['seed'],
+                        'python': platform.python_version(),
+                        'sqlite': sqlite3.sqlite_version,
+                    },
+                    'results': results,
+                }, file, ensure_ascii=False, indent=2)
+        if baseline is not None:
+            lines, regressions = benchmark.compare(
+                results, baseline, options['threshold']
+            )
+            for line in lines:
+                self.stdout.write(line)
+            if regressions:
+                raise CommandError(
+                    f'Регрессий относительно базового прогона: '
+                    f'{len(regressions)}'
+                )
+
+    def report(self, size, results):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{size} постов'))
+        for name, row in results.items():
+            self.stdout.write(
+                f'  {name:<14} p50 {row["p50_ms"]:>8.2f}  '
+                f'p95 {row["p95_ms"]:>8.2f}  p99 {row["p99_ms"]:>8.2f} мс  '
+                f'{row["queries"]:>6} запросов  {row["bytes"]:>8} байт'
+            )
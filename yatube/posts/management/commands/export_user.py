@@ -0,0 +1,57 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает посты, комментарии и картинки пользователя '
+        'в ZIP или NDJSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('output', help='Файл или "-" для stdout')
+        parser.add_argument(
+            '--format', dest='file_format', choices=['zip', 'ndjson'],
+            help='По умолчанию определяется по расширению файла'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        path = options['output']
+        file_format = options['file_format'] or (
+            'zip' if path.endswith('.zip') else 'ndjson'
+        )
+        if file_format == 'zip':
+            chunks = export.stream_archive(author)
+        else:
+            chunks = self.ndjson(author)
+
+        stream = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        written = 0
+        try:
+            for chunk in chunks:
+                stream.write(chunk)
+                written += len(chunk)
+        finally:
+            if path == '-':
+                stream.flush()
+            else:
+                stream.close()
+        if path != '-':
+            self.stdout.write(self.style.SUCCESS(
+                f'Записано {written} байт в {path}'
+            ))
+
+    def ndjson(self, author):
+        yield from export.iter_posts(author)
+        yield from export.iter_comments(author)
@@ -0,0 +1,68 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует правдоподобный набор пользователей, групп, постов, '
+        'комментариев, подписок и картинок через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=3000000)
+        parser.add_argument('--groups', type=int, default=2000)
+        parser.add_argument(
+            '--follows', type=int, default=30,
+            help='Среднее число подписок на пользователя'
+        )
+        parser.add_argument(
+            '--images', type=int, default=50,
+            help='Размер пула картинок, на которые ссылаются посты'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--anchor', type=date.fromisoformat, default=dataset.ANCHOR,
+            help='Дата ГГГГ-ММ-ДД, к которой привязаны даты постов '
+            f'(по умолчанию {dataset.ANCHOR})'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересобирать ленты, счётчики и поисковый индекс'
+        )
+
+    def handle(self, *args, **options):
+        self.started = time.monotonic()
+        try:
+            user_ids, post_ids = dataset.generate(
+                users=options['users'],
+                posts=options['posts'],
+                comments=options['comments'],
+                groups=options['groups'],
+                follows=options['follows'],
+                images=options['images'],
+                seed=options['seed'],
+                anchor=options['anchor'],
+                batch_size=options['batch_size'],
+                progress=self.progress,
+                rebuild=not options['skip_rebuild'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано {len(user_ids)} пользователей и {len(post_ids)} '
+            f'постов за {elapsed:.1f} с'
+        ))
+
+    def progress(self, model, total):
+        rate = total / max(time.monotonic() - self.started, 1e-6)
+        self.stdout.write(
+            f'{model._meta.model_name}: {total} строк, {rate:.0f} строк/с'
+        )
@@ -0,0 +1,191 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import bulk
+from posts.models import Comment, Follow, Group, Post, User
+
+
+def read_rows(stream, file_format):
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def parse_date(value, default):
+    if not value:
+        return default
+    parsed = parse_datetime(value)
+    if parsed is None:
+        return default
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает посты, комментарии или подписки из NDJSON/CSV '
+        'пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или "-" для stdin')
+        parser.add_argument(
+            '--model', required=True, choices=['post', 'comment', 'follow']
+        )
+        parser.add_argument(
+            '--format', dest='file_format', choices=['ndjson', 'csv'],
+            help='По умолчанию определяется по расширению файла'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересобирать ленты, счётчики и поисковый индекс'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['file_format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        self.users = bulk.Lookup(User, 'username')
+        self.groups = bulk.Lookup(Group, 'slug')
+        self.skipped = 0
+        build = getattr(self, f'build_{options["model"]}s')
+        model = {'post': Post, 'comment': Comment, 'follow': Follow}[
+            options['model']
+        ]
+
+        stream = sys.stdin if path == '-' else open(
+            path, encoding='utf-8', newline=''
+        )
+        started = time.monotonic()
+        after = bulk.last_id(model)
+        total = 0
+        failure = None
+        try:
+            with bulk.keep_dates():
+                for batch in batches(
+                    read_rows(stream, file_format), options['batch_size']
+                ):
+                    objects = build(batch)
+                    with transaction.atomic():
+                        model.objects.bulk_create(
+                            objects, ignore_conflicts=model is Follow
+                        )
+                    total += len(batch)
+                    rate = total / max(time.monotonic() - started, 1e-6)
+                    self.stdout.write(
+                        f'{total} строк, {rate:.0f} строк/с'
+                    )
+        except (ValueError, KeyError) as error:
+            failure = f'Ошибка в строке после {total}: {error}.'
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        # Уже закоммиченные пачки остаются в базе: ленты, счётчики и
+        # поиск для них нужны и при ошибке в середине файла
+        if not options['skip_rebuild'] and total:
+            with transaction.atomic():
+                bulk.rebuild_imported(model, after)
+        if failure is not None:
+            if not total:
+                raise CommandError(f'{failure} Ничего не загружено.')
+            if options['skip_rebuild']:
+                raise CommandError(
+                    f'{failure} Первые {total} строк загружены без '
+                    f'пересборки: запустите reconcile_counters и '
+                    f'rebuild_search_index.'
+                )
+            raise CommandError(
+                f'{failure} Первые {total} строк загружены, ленты, '
+                f'счётчики и поиск для них пересобраны.'
+            )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано {total} строк за {elapsed:.1f} с, '
+            f'пропущено {self.skipped}'
+        ))
+
+    def build_posts(self, rows):
+        self.users.load(row['author'] for row in rows)
+        self.groups.load(row.get('group') for row in rows)
+        now = timezone.now()
+        posts = []
+        for row in rows:
+            author_id = self.users.get(row['author'])
+            if author_id is None:
+                self.skipped += 1
+                continue
+            pub_date = parse_date(row.get('pub_date'), now)
+            group = row.get('group') or None
+            posts.append(Post(
+                text=row['text'],
+                author_id=author_id,
+                group_id=self.groups.get(group),
+                image=row.get('image') or None,
+                pub_date=pub_date,
+                created=pub_date,
+                updated=pub_date,
+            ))
+        return posts
+
+    def build_comments(self, rows):
+        self.users.load(row['author'] for row in rows)
+        wanted = list({int(row['post']) for row in rows})
+        post_ids = set()
+        for start in range(0, len(wanted), 500):
+            post_ids.update(Post.objects.filter(
+                pk__in=wanted[start:start + 500]
+            ).values_list('pk', flat=True))
+        now = timezone.now()
+        comments = []
+        for row in rows:
+            author_id = self.users.get(row['author'])
+            if author_id is None or int(row['post']) not in post_ids:
+                self.skipped += 1
+                continue
+            comments.append(Comment(
+                post_id=int(row['post']),
+                author_id=author_id,
+                text=row['text'],
+                pub_date=parse_date(row.get('pub_date'), now),
+            ))
+        return comments
+
+    def build_follows(self, rows):
+        self.users.load(row['user'] for row in rows)
+        self.users.load(row['author'] for row in rows)
+        follows = []
+        for row in rows:
+            user_id = self.users.get(row['user'])
+            author_id = self.users.get(row['author'])
+            # Дубли отсекает ignore_conflicts по objects_unique,
+            # подписку на себя запрещает prevent_self_follow
+            if None in (user_id, author_id) or user_id == author_id:
+                self.skipped += 1
+                continue
+            follows.append(Follow(user_id=user_id, author_id=author_id))
+        return follows
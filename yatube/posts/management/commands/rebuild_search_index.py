@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов и комментариев.'
+
+    def handle(self, *args, **options):
+        if not search.available():
+            self.stderr.write('FTS5-индекс не найден, нечего перестраивать')
+            return
+        with transaction.atomic():
+            search.rebuild()
+        self.stdout.write('Индекс перестроен')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = {
+                'groups': counters.reconcile_groups(),
+                'posts': counters.reconcile_posts(),
+                'users': counters.reconcile_users(),
+            }
+        for name, total in fixed.items():
+            self.stdout.write(f'{name}: исправлено {total}')
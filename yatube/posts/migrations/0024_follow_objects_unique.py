@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def drop_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    UserCounter = apps.get_model('posts', 'UserCounter')
+    # Подзапросом, а не списком: id оставляемых подписок не упираются
+    # в лимит параметров SQLite
+    keep = Follow.objects.order_by().values('user', 'author').annotate(
+        keep_id=Min('id')
+    ).values('keep_id')
+    deleted, _ = Follow.objects.exclude(pk__in=keep).delete()
+    if deleted:
+        # Исторические модели удаляют без сигналов: счётчики подписок,
+        # заполненные в 0021, пересчитываем по оставшимся строкам
+        UserCounter.objects.update(
+            followers_count=_count(Follow.objects.all(), 'author'),
+            following_count=_count(Follow.objects.all(), 'user'),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_posts_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_follows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('author', 'user'), name='objects_unique'),
+        ),
+    ]
@@ -5,7 +5,33 @@ from core.models import CreatedModel
 User = get_user_model()
 
 
-class Group(models.Model):
+class CountersModel(models.Model):
+    """Абстрактная модель с денормализованными счётчиками.
+
+    Счётчики меняются только UPDATE ... SET F() + 1 из сигналов, поэтому
+    save() существующей строки их не пишет: значение, прочитанное до
+    правки (post_edit, админка), затёрло бы приращения за это время.
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding and not args
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Group(CountersModel):
     title = models.CharField(
         verbose_name="Имя группы",
         max_length=200
@@ -17,12 +43,45 @@ class Group(models.Model):
     description = models.TextField(
         verbose_name="Описание"
     )
+    posts_count = models.PositiveIntegerField(
+        verbose_name="Число постов",
+        default=0,
+        editable=False
+    )
+
+    counter_fields = ('posts_count',)
 
     def __str__(self):
         return self.title
 
 
-class Post(CreatedModel):
+class PostQuerySet(models.QuerySet):
+    """Общие выборки для лент.
+
+    Все ленты рендерят includes/article.html, которому нужны автор и
+    группа поста, поэтому они подтягиваются одним JOIN'ом.
+    """
+
+    def for_feed(self):
+        return self.select_related('author', 'group')
+
+    def for_group(self, group):
+        return self.for_feed().filter(group=group)
+
+    def for_author(self, author):
+        return self.for_feed().filter(author=author)
+
+    def for_follower(self, user):
+        # Сортировка по колонкам записи ленты, а не поста: тогда порядок
+        # даёт индекс (user, pub_date, post) без сортировки во временном
+        # B-дереве.
+        return self.for_feed().filter(timeline_entries__user=user).order_by(
+            models.F('timeline_entries__pub_date').desc(),
+            models.F('timeline_entries__post_id').desc(),
+        )
+
+
+class Post(CountersModel, CreatedModel):
     text = models.TextField(
         verbose_name="Пост"
     )
@@ -50,9 +109,34 @@ class Post(CreatedModel):
         blank=True,
         null=True
     )
+    updated = models.DateTimeField(
+        verbose_name="Дата изменения",
+        auto_now=True
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name="Число комментариев",
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
+    counter_fields = ('comments_count',)
 
     class Meta:
         ordering = ["-pub_date"]
+        # Ленты фильтруют по группе или автору и сортируют по -pub_date:
+        # SQLite читает такие индексы в обратном порядке без сортировки.
+        indexes = [
+            models.Index(name='post_pub_date', fields=['pub_date']),
+            models.Index(
+                name='post_group_pub_date',
+                fields=['group', 'pub_date']
+            ),
+            models.Index(
+                name='post_author_pub_date',
+                fields=['author', 'pub_date']
+            ),
+        ]
 
     def __str__(self):
         # выводим текст поста
@@ -82,6 +166,14 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                name='comment_post_pub_date',
+                fields=['post', 'pub_date']
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -108,3 +200,77 @@ class Follow(models.Model):
                 fields=['author', 'user']
             )
         ]
+
+
+class UserCounter(models.Model):
+    """Денормализованные счётчики пользователя.
+
+    Поддерживаются сигналами при сохранении и удалении Post и Follow,
+    расхождения чинит команда reconcile_counters.
+    """
+    user = models.OneToOneField(
+        User,
+        verbose_name="Пользователь",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters'
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name="Число постов",
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name="Число подписчиков",
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name="Число подписок",
+        default=0
+    )
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок.
+
+    Строка на каждую пару (подписчик, пост автора), поэтому follow_index
+    читает диапазон по индексу (user, pub_date, post) без JOIN'а с Follow.
+    """
+    user = models.ForeignKey(
+        User,
+        verbose_name="Подписчик",
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name="Пост",
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name="Автор поста",
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name="Дата публикации"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='timeline_unique',
+                fields=['user', 'post']
+            )
+        ]
+        indexes = [
+            models.Index(
+                name='timeline_user_pub_date_post',
+                fields=['user', 'pub_date', 'post']
+            ),
+            models.Index(
+                name='timeline_user_author',
+                fields=['user', 'author']
+            ),
+        ]
@@ -0,0 +1,163 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+TABLE = 'posts_search'
+# rowid в FTS-таблице кодирует и вид записи, и её id: пост — 2 * id,
+# комментарий — 2 * id + 1. Так запись удаляется и заменяется по rowid
+# без сканирования таблицы.
+POST, COMMENT = 0, 1
+
+_available = None
+
+
+def available():
+    """Есть ли в базе FTS5-индекс (он создаётся только для SQLite)."""
+    global _available
+    if _available is None:
+        _available = (
+            connection.vendor == 'sqlite'
+            and TABLE in connection.introspection.table_names()
+        )
+    return _available
+
+
+def _rowid(kind, pk):
+    return pk * 2 + kind
+
+
+def index(kind, pk, post_id, text):
+    if not available():
+        return
+    rowid = _rowid(kind, pk)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, post_id) VALUES (%s, %s, %s)',
+            [rowid, text, post_id]
+        )
+
+
+def unindex(kind, pk):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid = %s', [_rowid(kind, pk)]
+        )
+
+
+def rebuild():
+    """Перестраивает индекс целиком, например после bulk_create."""
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, post_id) '
+            f'SELECT id * 2, text, id FROM posts_post'
+        )
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, post_id) '
+            f'SELECT id * 2 + 1, text, post_id FROM posts_comment'
+        )
+
+
+def index_after(kind, pk):
+    """Индексирует посты или комментарии с id больше pk.
+
+    Для строк, загруженных через bulk_create: новые получают id больше
+    прежнего максимума, а весь индекс не перестраивается.
+    """
+    if not available():
+        return
+    table, post_id = {
+        POST: ('posts_post', 'id'), COMMENT: ('posts_comment', 'post_id'),
+    }[kind]
+    with connection.cursor() as cursor:
+        # Часть строк диапазона уже могли проиндексировать сигналы
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid > %s AND rowid %% 2 = %s',
+            [_rowid(kind, pk), kind]
+        )
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, post_id) '
+            f'SELECT id * 2 + %s, text, {post_id} FROM {table} '
+            f'WHERE id > %s',
+            [kind, pk]
+        )
+
+
+def match_query(query):
+    """Строит безопасное FTS5-выражение: все слова, с поиском по префиксу."""
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def matching(kind, query):
+    """Подзапрос id постов или комментариев, подходящих под запрос.
+
+    Годится для pk__in и не упирается в лимит параметров SQLite.
+    """
+    return RawSQL(
+        f'SELECT rowid / 2 FROM {TABLE} '
+        f'WHERE {TABLE} MATCH %s AND rowid %% 2 = %s',
+        [match_query(query), kind]
+    )
+
+
+class SearchResults:
+    """Ранжированные посты, найденные по тексту поста и комментариев.
+
+    Поддерживает count() и срезы, поэтому передаётся в Paginator как есть.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.expression = match_query(query)
+
+    def count(self):
+        if not self.expression:
+            return 0
+        if not available():
+            return self._fallback().count()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(DISTINCT post_id) FROM {TABLE} '
+                f'WHERE {TABLE} MATCH %s',
+                [self.expression]
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def _fallback(self):
+        return Post.objects.for_feed().filter(
+            Q(text__icontains=self.query)
+            | Q(posts_comment__text__icontains=self.query)
+        ).distinct()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        if not self.expression:
+            return []
+        if not available():
+            return list(self._fallback()[item])
+        start = item.start or 0
+        with connection.cursor() as cursor:
+            # bm25 у FTS5 отрицательный: чем меньше, тем релевантнее
+            cursor.execute(
+                f'SELECT post_id FROM {TABLE} WHERE {TABLE} MATCH %s '
+                f'GROUP BY post_id ORDER BY MIN(rank), post_id DESC '
+                f'LIMIT %s OFFSET %s',
+                [self.expression, item.stop - start, start]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,127 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache, counters, follows, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+# Поля автора, которые видны во фрагментах постов и на страницах лент
+SHOWN_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def _bump_post_feeds(post, *group_ids):
+    """Сбрасывает версии лент, в которых показывается пост."""
+    scopes = ['index', f'profile:{post.author.username}']
+    slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk is not None]
+    ).values_list('slug', flat=True)
+    scopes.extend(f'group:{slug}' for slug in slugs)
+    cache.bump(*scopes)
+
+
+@receiver(pre_save, sender=Post)
+def post_pre_save(sender, instance, raw=False, **kwargs):
+    # Запоминаем прежнюю группу, чтобы при смене перенести счётчик
+    instance._old_group_id = None
+    if not instance._state.adding and not raw:
+        instance._old_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        timeline.fan_out(instance)
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+        counters.bump_group(instance.group_id, 1)
+    elif instance._old_group_id != instance.group_id:
+        counters.bump_group(instance._old_group_id, -1)
+        counters.bump_group(instance.group_id, 1)
+    _bump_post_feeds(instance, instance._old_group_id, instance.group_id)
+    search.index(search.POST, instance.pk, instance.pk, instance.text)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'posts_count', -1)
+    counters.bump_group(instance.group_id, -1)
+    _bump_post_feeds(instance, instance.group_id)
+    search.unindex(search.POST, instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_post(instance.post_id, 1)
+    cache.bump(f'post:{instance.post_id}')
+    search.index(
+        search.COMMENT, instance.pk, instance.post_id, instance.text
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+    cache.bump(f'post:{instance.post_id}')
+    search.unindex(search.COMMENT, instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        cache.bump('index', f'group:{instance.slug}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+        counters.bump_user(instance.user_id, 'following_count', 1)
+        follows.invalidate(instance.user_id)
+        cache.bump(f'following:{instance.user_id}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+    counters.bump_user(instance.author_id, 'followers_count', -1)
+    counters.bump_user(instance.user_id, 'following_count', -1)
+    follows.invalidate(instance.user_id)
+    cache.bump(f'following:{instance.user_id}')
+
+
+@receiver(pre_save, sender=User)
+def user_pre_save(sender, instance, raw=False, update_fields=None,
+                  **kwargs):
+    # Вход сохраняет только last_login: ленты трогать незачем
+    instance._old_shown = None
+    if raw or instance._state.adding:
+        return
+    if update_fields and not set(update_fields) & set(SHOWN_USER_FIELDS):
+        return
+    instance._old_shown = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*SHOWN_USER_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, **kwargs):
+    old = getattr(instance, '_old_shown', None)
+    shown = tuple(getattr(instance, field) for field in SHOWN_USER_FIELDS)
+    if raw or old is None or old == shown:
+        return
+    # Фрагменты постов сменят ключ сами (см. fragment_key), а страницы
+    # лент с постами автора нужно сбросить
+    slugs = Group.objects.filter(
+        group_posts__author=instance
+    ).values_list('slug', flat=True).distinct()
+    cache.bump(
+        'index', f'profile:{old[0]}', f'profile:{instance.username}',
+        *(f'group:{slug}' for slug in slugs)
+    )
@@ -0,0 +1,67 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .. import follows, thumbnails
+from ..cache import shown_digest, shown_values
+
+register = template.Library()
+
+FRAGMENT_KEY = 'post-fragment:{}:{}:{}'
+
+
+class Fragment:
+    """Готовый HTML поста вместе с самим постом: кнопки, зависящие от
+    читателя, рисуются рядом с общим для всех фрагментом."""
+
+    def __init__(self, post, html):
+        self.post = post
+        self.html = mark_safe(html)
+
+    def __str__(self):
+        return self.html
+
+    def __html__(self):
+        return self.html
+
+
+def fragment_key(post):
+    # updated меняется при каждом сохранении поста, поэтому правка
+    # через post_edit сама уводит пост на новый ключ. Автор и группа
+    # меняются без сохранения поста, поэтому в ключ входит и их хэш.
+    digest = shown_digest(shown_values(post))
+    return FRAGMENT_KEY.format(post.pk, post.updated.timestamp(), digest)
+
+
+@register.simple_tag
+def post_fragments(posts):
+    """Возвращает отрендеренные includes/article.html для постов ленты.
+
+    Все фрагменты страницы читаются одним get_many, рендерятся только
+    отсутствующие в кэше.
+    """
+    posts = list(posts)
+    keys = [fragment_key(post) for post in posts]
+    fragments = cache.get_many(keys)
+    missing = {}
+    for post, key in zip(posts, keys):
+        if key not in fragments:
+            fallbacks = thumbnails.fallbacks()
+            fragments[key] = render_to_string(
+                'includes/article.html', {'post': post}
+            )
+            # Миниатюра ещё не готова: не кэшируем фрагмент с оригиналом
+            if thumbnails.fallbacks() == fallbacks:
+                missing[key] = fragments[key]
+    if missing:
+        cache.set_many(missing, settings.FRAGMENT_CACHE_TIMEOUT)
+    return [Fragment(post, fragments[key]) for post, key in zip(posts, keys)]
+
+
+@register.simple_tag(takes_context=True)
+def following_set(context):
+    """Подписки текущего пользователя для кнопок всей страницы."""
+    user = context.get('user')
+    return follows.for_user(user.pk if user else None)
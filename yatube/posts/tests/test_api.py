@@ -0,0 +1,104 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+PAGE_LEN = 10
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Denis')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api-group', description='Описание'
+        )
+        for number in range(12):
+            Post.objects.create(
+                author=cls.user, text=f'Пост {number}', group=cls.group
+            )
+        cls.post = Post.objects.latest('id')
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, params=None, **kwargs):
+        response = self.client.get(reverse(f'api:{name}', kwargs=kwargs),
+                                   params or {})
+        return response, response.json()
+
+    def test_feeds_paginate_by_cursor(self):
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+        feeds = [
+            ('posts', {}),
+            ('group_posts', {'slug': self.group.slug}),
+            ('profile_posts', {'username': self.user.username}),
+        ]
+        for name, kwargs in feeds:
+            with self.subTest(feed=name):
+                response, first = self.get(name, **kwargs)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(len(first['results']), PAGE_LEN)
+                self.assertIsNone(first['previous'])
+                _, second = self.get(name, {'after': first['next']}, **kwargs)
+                self.assertIsNone(second['next'])
+                self.assertEqual(
+                    [post['id'] for post in first['results']
+                     + second['results']],
+                    expected
+                )
+
+    def test_fields_selection(self):
+        _, data = self.get('posts', {'fields': 'id,author'})
+        self.assertEqual(
+            data['results'][0],
+            {'id': self.post.id, 'author': self.user.username}
+        )
+        response, data = self.get('posts', {'fields': 'id,password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', data['error'])
+
+    def test_post_detail_and_comments(self):
+        _, data = self.get('post_detail', post_id=self.post.id)
+        self.assertEqual(data['comments_count'], 3)
+        self.assertEqual(data['group'], self.group.slug)
+        self.assertIsNone(data['image'])
+        _, data = self.get('post_comments', post_id=self.post.id)
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Комментарий 0', 'Комментарий 1', 'Комментарий 2']
+        )
+        response, _ = self.get('post_detail', post_id=0)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_batch_keeps_requested_order(self):
+        ids = list(Post.objects.values_list('id', flat=True)[:3])
+        wanted = [ids[2], 0, ids[0]]
+        with self.assertNumQueries(1):
+            _, data = self.get(
+                'posts_batch',
+                {'ids': ','.join(map(str, wanted)), 'fields': 'id'}
+            )
+        self.assertEqual(data['results'], [{'id': ids[2]}, {'id': ids[0]}])
+        response, _ = self.get('posts_batch', {'ids': 'a,b'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_payload_is_smaller_than_html(self):
+        html = self.client.get(reverse('posts:index'))
+        api = self.client.get(reverse('api:posts'))
+        self.assertLess(len(api.content) * 3, len(html.content))
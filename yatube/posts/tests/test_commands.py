@@ -0,0 +1,259 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+from django.test import TestCase, override_settings
+
+from .. import benchmark, dataset, search
+from ..models import (
+    Comment, Follow, Group, Post, TimelineEntry, UserCounter,
+)
+
+User = get_user_model()
+
+
+class ImportContentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.author = User.objects.create_user(username='Denis')
+        cls.reader = User.objects.create_user(username='Julia')
+        cls.group = Group.objects.create(
+            title='Группа', slug='imported', description='Описание'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def test_import_posts_comments_and_follows(self):
+        rows = [
+            {
+                'text': f'Импорт {number}',
+                'author': 'Denis',
+                'group': 'imported',
+                'pub_date': f'2020-01-0{number + 1}T10:00:00',
+            }
+            for number in range(3)
+        ]
+        rows.append({'text': 'Чужой', 'author': 'nobody'})
+        posts = self.write(
+            'posts.ndjson', '\n'.join(json.dumps(row) for row in rows)
+        )
+        out = StringIO()
+        call_command(
+            'import_content', posts, model='post', batch_size=2, stdout=out
+        )
+        self.assertIn('пропущено 1', out.getvalue())
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(
+            Post.objects.earliest('pub_date').pub_date.isoformat(),
+            '2020-01-01T10:00:00+00:00'
+        )
+
+        post = Post.objects.first()
+        comments = self.write(
+            'comments.csv',
+            f'post,author,text\n{post.id},Julia,Отлично\n'
+        )
+        call_command(
+            'import_content', comments, model='comment', stdout=StringIO()
+        )
+        self.assertEqual(Comment.objects.get().post, post)
+
+        follows = self.write(
+            'follows.csv',
+            'user,author\nJulia,Denis\nJulia,Denis\nDenis,Denis\n'
+        )
+        call_command(
+            'import_content', follows, model='follow', stdout=StringIO()
+        )
+        self.assertEqual(Follow.objects.count(), 1)
+
+        # Производные данные пересобраны после загрузки
+        self.group.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 3)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.author.counters.posts_count, 3)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+
+    def test_rebuild_touches_only_imported_rows(self):
+        other = Group.objects.create(title='Другая', slug='other')
+        old = Post.objects.create(author=self.reader, text='Старый пост')
+        Follow.objects.create(user=self.author, author=self.reader)
+        # Расхождения вне загрузки чинит reconcile_counters, а не импорт
+        Group.objects.filter(pk=other.pk).update(posts_count=7)
+        TimelineEntry.objects.filter(post=old).delete()
+        posts = self.write('scoped.ndjson', json.dumps(
+            {'text': 'Новый', 'author': 'Denis', 'group': 'imported'}
+        ))
+        call_command('import_content', posts, model='post', stdout=StringIO())
+        other.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(other.posts_count, 7)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertFalse(TimelineEntry.objects.filter(post=old).exists())
+        new = Post.objects.get(text='Новый')
+        self.assertEqual(
+            list(Post.objects.filter(
+                pk__in=search.matching(search.POST, 'Новый')
+            )),
+            [new]
+        )
+
+    def test_failed_import_rebuilds_committed_batches(self):
+        rows = [{'text': 'Пост', 'author': 'Denis'}] * 2 + [{'text': '-'}]
+        posts = self.write(
+            'broken.ndjson', '\n'.join(json.dumps(row) for row in rows)
+        )
+        with self.assertRaisesMessage(CommandError, 'пересобраны'):
+            call_command(
+                'import_content', posts, model='post', batch_size=2,
+                stdout=StringIO()
+            )
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            UserCounter.objects.get(user=self.author).posts_count, 2
+        )
+        with self.assertRaisesMessage(CommandError, 'reconcile_counters'):
+            call_command(
+                'import_content', posts, model='post', batch_size=2,
+                skip_rebuild=True, stdout=StringIO()
+            )
+
+
+class ExportUserTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.author = User.objects.create_user(username='Exporter')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        Comment.objects.create(
+            post=cls.post, author=cls.author, text='Комментарий'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def test_export_ndjson(self):
+        path = os.path.join(self.directory, 'export.ndjson')
+        call_command('export_user', 'Exporter', path, stdout=StringIO())
+        with open(path, encoding='utf-8') as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual(
+            [(row['type'], row['text']) for row in rows],
+            [('post', 'Пост'), ('comment', 'Комментарий')],
+        )
+
+
+@override_settings(THUMBNAIL_WORKERS=0)
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        dataset.generate(**dataset.scaled(50), seed=1)
+
+    def test_run_reports_every_route(self):
+        results = benchmark.run(requests=3, warmup=1, seed=1)
+        self.assertEqual(set(results), {
+            'index', 'group_list', 'profile', 'post_detail', 'search',
+            'follow_index', 'post_create', 'add_comment',
+        })
+        for name, row in results.items():
+            with self.subTest(route=name):
+                self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+                self.assertGreater(row['queries'], 0)
+        self.assertGreater(results['index']['bytes'], 0)
+
+    def test_compare_flags_regressions(self):
+        row = {'p95_ms': 10, 'queries': 2}
+        baseline = {'50': {'index': row, 'profile': row}}
+        results = {'50': {
+            'index': {'p95_ms': 11, 'queries': 2},
+            'profile': {'p95_ms': 10, 'queries': 3},
+        }}
+        lines, regressions = benchmark.compare(results, baseline, 0.2)
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('profile', regressions[0])
+
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+
+
+class GenerateDatasetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media, ignore_errors=True)
+
+    def generate(self, seed):
+        with override_settings(MEDIA_ROOT=self.media):
+            call_command(
+                'generate_dataset', users=200, posts=1000, comments=2000,
+                groups=10, follows=20, images=2, seed=seed,
+                batch_size=300, stdout=StringIO()
+            )
+
+    def test_generates_power_law_dataset(self):
+        self.generate(seed=3)
+        self.assertEqual(User.objects.count(), 200)
+        self.assertEqual(Post.objects.count(), 1000)
+        self.assertEqual(Comment.objects.count(), 2000)
+        self.assertEqual(Group.objects.count(), 10)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        followers = sorted(
+            User.objects.values_list(
+                'counters__followers_count', flat=True
+            ),
+            reverse=True
+        )
+        # Горстка знаменитостей и длинный хвост
+        self.assertGreater(followers[0], 10 * followers[len(followers) // 2])
+        self.assertEqual(
+            TimelineEntry.objects.count(),
+            Follow.objects.aggregate(total=Count('author__posts'))['total']
+        )
+        # Повтор с тем же seed не падает на пустых списках id
+        with self.assertRaisesMessage(CommandError, 'другой seed'):
+            self.generate(seed=3)
+        self.assertEqual(User.objects.count(), 200)
+
+    def test_same_seed_gives_same_data(self):
+        first, second = dataset.Generator(seed=5), dataset.Generator(seed=5)
+        self.assertEqual(
+            [first.text(40) for _ in range(5)],
+            [second.text(40) for _ in range(5)]
+        )
+        self.assertEqual(first.date(), second.date())
+        # Даты не зависят от дня запуска
+        self.assertLessEqual(first.date(), first.now)
+        self.assertEqual(first.now.date(), dataset.ANCHOR)
@@ -1,14 +1,19 @@
 import shutil
 import tempfile
+from io import BytesIO
 from http import HTTPStatus
 from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 
 from ..forms import PostForm, CommentForm
 from ..models import Post, User, Group, Comment
+from .. import thumbnails
+from sorl.thumbnail import get_thumbnail
 from django.urls import reverse
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
 
 User = get_user_model()
 
@@ -205,6 +210,130 @@ class TaskCreateFormTests(TestCase):
                 )
 
 
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    IMAGE_UPLOAD_MAX_SIZE=(800, 800),
+    IMAGE_UPLOAD_FORMAT='JPEG',
+)
+class ImageNormalizationTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_upload_is_resized_rotated_and_stripped(self):
+        """Загрузка уменьшается, поворачивается по EXIF и теряет EXIF."""
+        image = Image.new('RGBA', (2000, 1000), color=(255, 0, 0, 128))
+        exif = Image.Exif()
+        # 6 — камера была повёрнута, картинку нужно развернуть на 90°
+        exif[0x0112] = 6
+        buffer = BytesIO()
+        image.convert('RGB').save(buffer, 'JPEG', exif=exif.tobytes())
+        form = PostForm(
+            data={'text': 'Пост'},
+            files={'image': SimpleUploadedFile(
+                'photo.jpeg', buffer.getvalue(), content_type='image/jpeg'
+            )},
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        post = form.save(commit=False)
+        post.author = User.objects.create_user(username='Denis')
+        post.save()
+        self.assertTrue(post.image.name.endswith('photo.jpg'))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.format, 'JPEG')
+            self.assertEqual(stored.size, (400, 800))
+            self.assertNotIn('exif', stored.info)
+
+    def test_truncated_upload_is_a_form_error(self):
+        buffer = BytesIO()
+        Image.effect_noise((400, 400), 64).convert('RGB').save(
+            buffer, 'JPEG'
+        )
+        form = PostForm(
+            data={'text': 'Пост'},
+            files={'image': SimpleUploadedFile(
+                'broken.jpg', buffer.getvalue()[:2000],
+                content_type='image/jpeg'
+            )},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def test_icc_profile_kept_only_for_same_color_space(self):
+        for mode, kept in (('RGB', True), ('CMYK', False)):
+            with self.subTest(mode=mode):
+                buffer = BytesIO()
+                Image.new(mode, (100, 100)).save(
+                    buffer, 'JPEG', icc_profile=b'profile-' + mode.encode()
+                )
+                form = PostForm(
+                    data={'text': 'Пост'},
+                    files={'image': SimpleUploadedFile(
+                        'photo.jpg', buffer.getvalue(),
+                        content_type='image/jpeg'
+                    )},
+                )
+                self.assertTrue(form.is_valid(), form.errors)
+                with Image.open(form.cleaned_data['image']) as stored:
+                    self.assertEqual(stored.mode, 'RGB')
+                    self.assertEqual(
+                        'icc_profile' in stored.info, kept
+                    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), color=(0, 128, 255)).save(
+            buffer, 'JPEG'
+        )
+        self.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=User.objects.create_user(username='Denis'),
+            image=SimpleUploadedFile('big.jpg', buffer.getvalue()),
+        )
+
+    def test_request_path_does_not_resize(self):
+        """Без готовой миниатюры в запросе отдаётся оригинал."""
+        image = get_thumbnail(self.post.image, '960x339', crop='center')
+        self.assertEqual(image.name, self.post.image.name)
+
+    def test_feed_is_not_cached_until_thumbnail_is_ready(self):
+        cache.clear()
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertContains(response, self.post.image.url)
+        self.assertFalse(response.has_header('ETag'))
+        thumbnails.generate(self.post.image.name)
+        response = self.client.get(url)
+        self.assertNotContains(response, self.post.image.url)
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_post_detail_etag_changes_once_thumbnail_is_ready(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.client.get(url)['ETag']
+        thumbnails.generate(self.post.image.name)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotContains(response, self.post.image.url)
+
+    def test_pregenerated_thumbnail_is_served(self):
+        thumbnails.generate(self.post.image.name)
+        image = get_thumbnail(
+            self.post.image, '960x339', crop='center', upscale=True
+        )
+        self.assertNotEqual(image.name, self.post.image.name)
+        self.assertTrue(image.exists())
+        self.assertEqual((image.width, image.height), (960, 339))
+
+
 class CommentsTests(TestCase):
     @classmethod
     def setUpClass(cls):
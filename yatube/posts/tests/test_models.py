@@ -1,6 +1,9 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post, UserCounter
 
 User = get_user_model()
 
@@ -30,3 +33,86 @@ class PostModelTest(TestCase):
             str(self.post),
             self.post.text[:15],
         )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='first',
+            description='Тестовое описание',
+        )
+        cls.group_2 = Group.objects.create(
+            title='Вторая группа',
+            slug='second',
+            description='Тестовое описание',
+        )
+
+    def test_counters_follow_writes(self):
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        self.group.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.user.counters.posts_count, 1)
+        self.assertEqual(self.user.counters.followers_count, 1)
+        self.assertEqual(self.reader.counters.following_count, 1)
+
+        post.group = self.group_2
+        post.save()
+        self.group.refresh_from_db()
+        self.group_2.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.group_2.posts_count, 1)
+
+        follow.delete()
+        post.delete()
+        self.user.counters.refresh_from_db()
+        self.group_2.refresh_from_db()
+        self.assertEqual(self.user.counters.posts_count, 0)
+        self.assertEqual(self.user.counters.followers_count, 0)
+        self.assertEqual(self.group_2.posts_count, 0)
+
+    def test_save_keeps_counters_bumped_meanwhile(self):
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        group = Group.objects.get(pk=self.group.pk)
+        stale = Post.objects.get(pk=post.pk)
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Post.objects.create(author=self.user, text='Ещё', group=self.group)
+        # Правка поста и группы со счётчиками, прочитанными раньше
+        stale.text = 'Исправленный пост'
+        stale.save()
+        group.title = 'Новое имя'
+        group.save()
+        post.refresh_from_db()
+        group.refresh_from_db()
+        self.assertEqual(post.text, 'Исправленный пост')
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(group.title, 'Новое имя')
+        self.assertEqual(group.posts_count, 2)
+
+    def test_reconcile_counters_fixes_drift(self):
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        Group.objects.update(posts_count=7)
+        UserCounter.objects.update(posts_count=0)
+        Post.objects.update(comments_count=3)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.group.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(
+            UserCounter.objects.get(user=self.user).posts_count, 1
+        )
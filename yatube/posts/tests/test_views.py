@@ -1,10 +1,23 @@
+import json
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
-from ..models import Group, Post, Follow
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from ..models import Comment, Group, Post, Follow, TimelineEntry
 from django.urls import reverse
 from django import forms
 from http import HTTPStatus
 from django.core.cache import cache
+from ..templatetags.fragments import fragment_key
+from .. import cache as feed_cache, follows
+from ..utils import COMMENT_NUMBER
 
 User = get_user_model()
 
@@ -223,6 +236,249 @@ class PaginatorViewsTest(TestCase):
         )
 
 
+@override_settings(POSTS_CURSOR_PAGINATION=True)
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Denis')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовый текст',
+            slug='test-slug'
+        )
+        for post in range(12):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Text Post {post + 1}',
+                group=cls.group
+            )
+        # Одинаковая дата у всех постов: порядок держится на id
+        Post.objects.update(pub_date=Post.objects.first().pub_date)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_cursor_pages_cover_all_posts(self):
+        '''Курсорные страницы всех лент отдают все посты без повторов'''
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        ]
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.authorized_client.get(url).context['page_obj']
+                self.assertEqual(len(first), PAGE_LEN)
+                self.assertFalse(first.has_previous())
+                second = self.authorized_client.get(
+                    url, {'after': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), 2)
+                self.assertFalse(second.has_next())
+                self.assertEqual(
+                    [post.id for post in first] + [post.id for post in second],
+                    expected
+                )
+                back = self.authorized_client.get(
+                    url, {'before': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    [post.id for post in back],
+                    [post.id for post in first]
+                )
+
+    def test_cursor_page_has_no_count_query(self):
+        '''Курсорная страница не выполняет COUNT(*)'''
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(reverse('posts:index'))
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'after': 'broken'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(response.context['page_obj']), PAGE_LEN)
+
+
+class FeedQueriesTest(TestCase):
+    '''Число запросов ленты не зависит от числа постов на странице.
+
+    Если в includes/article.html появится обращение к связанной модели,
+    которое не подгружено в PostQuerySet.for_feed, тест упадёт.
+    '''
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Denis')
+        cls.reader = User.objects.create_user(username='Julia')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовый текст',
+            slug='test-slug'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return len(queries)
+
+    def test_feed_queries_do_not_grow_with_posts(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:follow_index'),
+        ]
+        Post.objects.create(author=self.user, text='Post', group=self.group)
+        single = {url: self.count_queries(url) for url in urls}
+        for number in range(PAGE_LEN - 1):
+            Post.objects.create(
+                author=self.user, text=f'Post {number}', group=self.group
+            )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), single[url])
+
+
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Denis')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.quiet = Post.objects.create(author=cls.user, text='Тихий пост')
+        Comment.objects.create(
+            post=cls.quiet, author=cls.user, text='Единственный'
+        )
+        cls.total = COMMENT_NUMBER + 5
+        for number in range(cls.total):
+            author = User.objects.create_user(username=f'reader{number}')
+            Comment.objects.create(
+                post=cls.post, author=author, text=f'Комментарий {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response, len(queries)
+
+    def test_first_page_and_fragment(self):
+        response, queries = self.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENT_NUMBER)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertTrue(comments.has_next())
+        fragment_url = reverse(
+            'posts:post_comments', kwargs={'post_id': self.post.id}
+        )
+        self.assertContains(response, f'{fragment_url}?after=')
+        # Авторы приходят тем же запросом, что и комментарии
+        _, single = self.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.quiet.id})
+        )
+        self.assertEqual(queries, single)
+
+        response, _ = self.get(
+            fragment_url, {'after': comments.next_cursor}
+        )
+        rest = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in rest],
+            [f'Комментарий {number}'
+             for number in range(COMMENT_NUMBER, self.total)]
+        )
+        self.assertFalse(rest.has_next())
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'Показать ещё')
+
+
+class QueryPlanTest(TestCase):
+    '''Запросы лент идут по индексам и не сортируют во временном B-дереве'''
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='plan', description='Описание'
+        )
+        for number in range(PAGE_LEN + 2):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def assert_plans_use_indexes(self, url, params=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        for query in queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                steps = [row[-1] for row in cursor.fetchall()]
+            for step in steps:
+                with self.subTest(url=url, sql=query['sql'], step=step):
+                    self.assertNotIn('TEMP B-TREE', step)
+                    if step.startswith('SCAN'):
+                        self.assertIn('INDEX', step)
+        return response
+
+    def test_feed_plans(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            self.assert_plans_use_indexes(url)
+        with override_settings(POSTS_CURSOR_PAGINATION=True):
+            for url in urls:
+                page = self.assert_plans_use_indexes(url).context.get(
+                    'page_obj'
+                )
+                if page is not None:
+                    self.assert_plans_use_indexes(
+                        url, {'after': page.next_cursor}
+                    )
+
+
 class PagesTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -298,19 +554,124 @@ class CacheTest(TestCase):
 
         self.assertEqual(response.status_code, HTTPStatus.OK)
         index_page_content_1 = response.content
+        # Пока ленты не менялись, страница отдаётся из кэша без запросов
+        # к постам
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(
+                reverse('posts:index')
+            )
+        self.assertEqual(response.content, index_page_content_1)
+        self.assertFalse(
+            any('posts_post' in query['sql'] for query in queries)
+        )
+        # Удаление поста сбрасывает версию ленты без очистки всего кэша
         self.post.delete()
         response = self.authorized_client.get(
             reverse('posts:index')
         )
         self.assertEqual(response.status_code, HTTPStatus.OK)
         index_page_content_2 = response.content
-        self.assertEqual(index_page_content_1, index_page_content_2)
+        self.assertNotEqual(index_page_content_1, index_page_content_2)
+
+    def test_unrelated_write_keeps_group_page_cached(self):
+        group = Group.objects.create(
+            title='Группа', description='Текст', slug='cached'
+        )
+        other = Group.objects.create(
+            title='Другая', description='Текст', slug='other'
+        )
+        Post.objects.create(author=self.user, text='In group', group=group)
+        url = reverse('posts:group_list', kwargs={'slug': group.slug})
+        content = self.authorized_client.get(url).content
+        Post.objects.create(author=self.user, text='Other', group=other)
+        self.assertEqual(self.authorized_client.get(url).content, content)
+        Post.objects.create(author=self.user, text='Fresh', group=group)
+        self.assertNotEqual(
+            self.authorized_client.get(url).content, content
+        )
+
+    def test_readers_with_equal_versions_get_own_pages(self):
+        other = User.objects.create_user(username='Julia')
+        client = Client()
+        client.force_login(other)
+        for user in (self.user, other):
+            cache.set(feed_cache._key(f'following:{user.pk}'), 1, None)
+        self.authorized_client.get(reverse('posts:index'))
+        response = client.get(reverse('posts:index'))
+        self.assertContains(response, 'Julia')
+        self.assertNotContains(response, 'Denis')
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Denis')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
         cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def revalidate(self, url):
+        etag = self.authorized_client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(
+                url, HTTP_IF_NONE_MATCH=etag
+            )
+        return etag, response, queries
+
+    def test_feed_answers_not_modified_without_queries(self):
+        url = reverse('posts:index')
+        etag, response, queries = self.revalidate(url)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertFalse(
+            any('posts_post' in query['sql'] for query in queries)
+        )
+        self.assertIn('no-cache', self.authorized_client.get(url)[
+            'Cache-Control'
+        ])
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        # Другая страница ленты — другой ETag
+        other = self.authorized_client.get(url, {'page': 2})['ETag']
+        self.assertNotEqual(other, response['ETag'])
+
+    def test_post_detail_not_modified_until_commented(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag, response, queries = self.revalidate(url)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertFalse(
+            any('posts_comment' in query['sql'] for query in queries)
+        )
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Комментарий')
+
+    def test_post_detail_etag_follows_author_and_group(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etags = [self.authorized_client.get(url)['ETag']]
+        group = Group.objects.create(title='Группа', slug='etag')
+        # Без сохранения поста: updated не меняется
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        etags.append(self.authorized_client.get(url)['ETag'])
+        Group.objects.filter(pk=group.pk).update(title='Новое имя')
+        etags.append(self.authorized_client.get(url)['ETag'])
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = 'Денис'
+        author.save()
         response = self.authorized_client.get(
-            reverse('posts:index')
+            url, HTTP_IF_NONE_MATCH=etags[-1]
         )
-        index_page_contex_3 = response.content
-        self.assertNotEqual(index_page_content_1, index_page_contex_3)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Денис')
+        etags.append(response['ETag'])
+        self.assertEqual(len(set(etags)), 4)
 
 
 class FollowTest(TestCase):
@@ -392,3 +753,267 @@ class FollowTest(TestCase):
             posts_before_following,
             posts_new_user
         )
+
+    def test_following_state_is_the_viewers(self):
+        cache.clear()
+        Follow.objects.create(user=self.user2, author=self.user)
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        # На Denis подписана Julia, но не сам читатель
+        response = self.authorized_client.get(url)
+        self.assertFalse(response.context['following'])
+        response = self.authorized_client_2.get(url)
+        self.assertTrue(response.context['following'])
+        with self.assertNumQueries(0):
+            self.assertIn(self.user.pk, follows.for_user(self.user2.pk))
+
+    def test_feed_buttons_follow_subscriptions(self):
+        cache.clear()
+        unfollow = reverse(
+            'posts:profile_unfollow', kwargs={'username': self.user2}
+        )
+        follow = reverse(
+            'posts:profile_follow', kwargs={'username': self.user2}
+        )
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, follow)
+        # На себя подписаться нельзя, кнопки нет
+        self.assertNotContains(response, f'Подписаться на {self.user}')
+        self.authorized_client.get(follow)
+        self.assertIn(self.user2.pk, follows.for_user(self.user.pk))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, unfollow)
+        self.authorized_client.get(unfollow)
+        self.assertNotIn(self.user2.pk, follows.for_user(self.user.pk))
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotContains(response, follow)
+
+
+@override_settings(TIMELINE_BATCH_SIZE=1)
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Denis')
+        cls.readers = [
+            User.objects.create_user(username=f'reader_{number}')
+            for number in range(3)
+        ]
+        cls.old_post = Post.objects.create(author=cls.author, text='Old')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.readers[0])
+
+    def test_follow_backfills_and_unfollow_prunes_timeline(self):
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': self.author})
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.readers[0], post=self.old_post
+            ).exists()
+        )
+        self.authorized_client.get(
+            reverse(
+                'posts:profile_unfollow', kwargs={'username': self.author}
+            )
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.readers[0]).exists()
+        )
+
+    def test_new_post_fans_out_to_every_follower(self):
+        for reader in self.readers:
+            Follow.objects.create(user=reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='New')
+        self.assertEqual(
+            TimelineEntry.objects.filter(post=post).count(),
+            len(self.readers)
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [item.id for item in response.context['page_obj']],
+            [post.id, self.old_post.id]
+        )
+
+
+class FragmentCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Denis')
+        cls.post = Post.objects.create(author=cls.user, text='First')
+        cls.other = Post.objects.create(author=cls.user, text='Second')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feed_reuses_cached_fragments(self):
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        response = self.authorized_client.get(url)
+        self.assertTemplateUsed(response, 'includes/article.html')
+        self.assertIsNotNone(cache.get(fragment_key(self.post)))
+        self.assertIsNotNone(cache.get(fragment_key(self.other)))
+        # Правка второго поста сбрасывает страницу ленты, но заново
+        # рендерится только его фрагмент
+        Post.objects.get(pk=self.other.pk).save()
+        response = self.authorized_client.get(url)
+        self.assertEqual(
+            [t.name for t in response.templates].count(
+                'includes/article.html'
+            ),
+            1
+        )
+
+    def test_post_edit_invalidates_only_its_fragment(self):
+        self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': self.user})
+        )
+        old_key = fragment_key(self.post)
+        other_key = fragment_key(self.other)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={'text': 'Edited'},
+        )
+        self.post.refresh_from_db()
+        self.assertNotEqual(fragment_key(self.post), old_key)
+        self.assertIsNone(cache.get(fragment_key(self.post)))
+        self.assertEqual(fragment_key(Post.objects.get(pk=self.other.pk)),
+                         other_key)
+        self.assertIsNotNone(cache.get(other_key))
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': self.user})
+        )
+        self.assertContains(response, 'Edited')
+
+    def test_author_and_group_changes_reach_fragments(self):
+        group = Group.objects.create(
+            title='Группа', slug='gslug', description='Описание'
+        )
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        self.authorized_client.get(reverse('posts:index'))
+        group.delete()
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = 'Денис'
+        author.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, '/group/gslug/')
+        self.assertContains(response, 'Денис')
+        # Вход обновляет только last_login и ленты не сбрасывает
+        key = fragment_key(Post.objects.get(pk=self.post.pk))
+        self.authorized_client.force_login(self.user)
+        self.assertEqual(
+            fragment_key(Post.objects.get(pk=self.post.pk)), key
+        )
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username='Denis', email='denis@example.com', password='pass'
+        )
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Кошки и кошки, снова кошки'
+        )
+        cls.dogs = Post.objects.create(author=cls.user, text='Про собак')
+        cls.comment = Comment.objects.create(
+            post=cls.dogs, author=cls.user, text='А у меня кошка'
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def search(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return [post.id for post in response.context['page_obj']]
+
+    def test_search_ranks_posts_and_comments(self):
+        self.assertEqual(self.search('кошк'), [self.cats.id, self.dogs.id])
+        self.assertEqual(self.search('собак'), [self.dogs.id])
+        self.assertEqual(self.search('"); DROP'), [])
+
+    def test_index_follows_writes(self):
+        Post.objects.filter(pk=self.cats.pk).get().delete()
+        self.comment.text = 'Комментарий без слова'
+        self.comment.save()
+        self.assertEqual(self.search('кошк'), [])
+        post = Post.objects.create(author=self.user, text='Новая кошка')
+        self.assertEqual(self.search('кошк'), [post.id])
+
+    def test_admin_search_uses_index(self):
+        response = self.authorized_client.get(
+            '/admin/posts/post/', {'q': 'собак'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.dogs]
+        )
+        response = self.authorized_client.get(
+            '/admin/posts/comment/', {'q': 'кошка'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.comment]
+        )
+
+
+EXPORT_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=EXPORT_MEDIA_ROOT)
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Exporter')
+        cls.other = User.objects.create_user(username='Stranger')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('photo.gif', b'GIF89a-bytes'),
+        )
+        Post.objects.create(author=cls.other, text='Чужой пост')
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Свой комментарий'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(EXPORT_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_export_streams_zip(self):
+        url = reverse('posts:profile_export', args=[self.user.username])
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content)
+        archive = zipfile.ZipFile(BytesIO(content))
+        self.assertEqual(
+            archive.namelist(),
+            ['posts.ndjson', 'comments.ndjson', f'images/{self.post.image}'],
+        )
+        posts = [
+            json.loads(line)
+            for line in archive.read('posts.ndjson').splitlines()
+        ]
+        self.assertEqual([post['id'] for post in posts], [self.post.id])
+        comments = archive.read('comments.ndjson').decode()
+        self.assertIn('Свой комментарий', comments)
+        self.assertEqual(
+            archive.read(f'images/{self.post.image}'), b'GIF89a-bytes'
+        )
+
+    def test_export_of_other_user_redirects(self):
+        url = reverse('posts:profile_export', args=[self.other.username])
+        response = self.client.get(url)
+        self.assertRedirects(
+            response,
+            reverse('posts:profile', args=[self.other.username])
+        )
@@ -0,0 +1,139 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_lock = threading.Lock()
+_executor = None
+_slots = None
+_pending = set()
+
+
+class PregeneratedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который не ресайзит картинки внутри запроса.
+
+    В запросе миниатюра только читается из kvstore. Если её ещё нет,
+    генерация уходит в фоновый пул, а шаблон получает исходную картинку.
+    """
+
+    def _lookup(self, file_, geometry_string, options):
+        # Повторяет подготовку опций ThumbnailBackend.get_thumbnail, чтобы
+        # получить то же имя файла миниатюры.
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return source, default.kvstore.get(ImageFile(name, default.storage))
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if getattr(_local, 'generating', False) or not file_:
+            return super().get_thumbnail(file_, geometry_string, **options)
+        source, cached = self._lookup(file_, geometry_string, dict(options))
+        if cached:
+            return cached
+        _local.fallbacks = getattr(_local, 'fallbacks', 0) + 1
+        if source.exists():
+            schedule(source.name)
+        return source
+
+
+def fallbacks():
+    """Сколько раз в этом потоке вместо миниатюры отдан оригинал.
+
+    Фрагменты с таким оригиналом не стоит кэшировать надолго.
+    """
+    return getattr(_local, 'fallbacks', 0)
+
+
+def ready(name):
+    """Созданы ли все миниатюры из THUMBNAIL_PRESETS для картинки name."""
+    return all(
+        default.backend._lookup(name, geometry, dict(options))[1]
+        for geometry, options in settings.THUMBNAIL_PRESETS
+    )
+
+
+def generate(name):
+    """Синхронно создаёт все миниатюры из THUMBNAIL_PRESETS."""
+    _local.generating = True
+    try:
+        for geometry, options in settings.THUMBNAIL_PRESETS:
+            default.backend.get_thumbnail(name, geometry, **options)
+    finally:
+        _local.generating = False
+
+
+def _run(name):
+    try:
+        generate(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        _slots.release()
+        # Поток пула держит собственные соединения с БД (kvstore)
+        connections.close_all()
+
+
+def _pool():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            _slots = threading.BoundedSemaphore(settings.THUMBNAIL_QUEUE_SIZE)
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def _submit(name):
+    if not settings.THUMBNAIL_WORKERS:
+        # Без пула (THUMBNAIL_WORKERS = 0) генерируем сразу
+        generate(name)
+        return
+    executor = _pool()
+    with _lock:
+        # Картинка уже в очереди: например, после post_create её сразу
+        # открыли в ленте, и бэкенд попросил миниатюру ещё раз
+        if name in _pending:
+            return
+        if not _slots.acquire(blocking=False):
+            logger.warning(
+                'Очередь миниатюр переполнена, пропускаем %s', name
+            )
+            return
+        _pending.add(name)
+    executor.submit(_run, name)
+
+
+def schedule(name):
+    """Ставит генерацию миниатюр в фоновый пул после коммита транзакции.
+
+    Очередь ограничена THUMBNAIL_QUEUE_SIZE: при переполнении задача
+    отбрасывается, миниатюру поставит в очередь следующий просмотр.
+    """
+    transaction.on_commit(lambda: _submit(name))
+
+
+def pregenerate(post):
+    """Запускает генерацию миниатюр сохранённого поста."""
+    if post.image:
+        schedule(post.image.name)
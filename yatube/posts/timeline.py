@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.db import connection
+
+from .models import Follow, Post, TimelineEntry
+
+
+def _batch_size():
+    return getattr(settings, 'TIMELINE_BATCH_SIZE', 1000)
+
+
+def _write(entries):
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Раскладывает новый пост в ленты всех подписчиков автора пачками."""
+    batch = []
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    for user_id in followers.iterator():
+        batch.append(TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        ))
+        if len(batch) >= _batch_size():
+            _write(batch)
+            batch = []
+    if batch:
+        _write(batch)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    batch = []
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).order_by().values_list('id', 'pub_date')
+    for post_id, pub_date in posts.iterator():
+        batch.append(TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        ))
+        if len(batch) >= _batch_size():
+            _write(batch)
+            batch = []
+    if batch:
+        _write(batch)
+
+
+def prune(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(posts_after=0, follows_after=0):
+    """Досоздаёт записи лент для всех подписок одним INSERT ... SELECT.
+
+    Нужен после загрузок через bulk_create, которые обходят сигналы.
+    posts_after и follows_after ограничивают пересборку постами и
+    подписками с большими id, то есть только что загруженными.
+    """
+    if connection.vendor == 'sqlite':
+        insert, conflict = 'INSERT OR IGNORE INTO', ''
+    else:
+        insert, conflict = 'INSERT INTO', ' ON CONFLICT DO NOTHING'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{insert} {TimelineEntry._meta.db_table} '
+            f'(user_id, post_id, author_id, pub_date) '
+            f'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+            f'FROM {Follow._meta.db_table} f '
+            f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+            f'WHERE p.id > %s AND f.id > %s'
+            f'{conflict}',
+            [posts_after, follows_after]
+        )
@@ -1,9 +1,175 @@
+import base64
+import json
+from collections.abc import Sequence
+
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
 
 POST_NUMBER = 10
+COMMENT_NUMBER = 20
+
+
+def encode_cursor(position):
+    """Упаковывает позицию (pub_date, id) в непрозрачный токен."""
+    pub_date, pk = position
+    raw = json.dumps([pub_date.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен. Для битого токена возвращает None."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        pub_date, pk = json.loads(base64.urlsafe_b64decode(padded))
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации.
+
+    Повторяет интерфейс django.core.paginator.Page, который нужен шаблонам,
+    но вместо номеров страниц отдаёт токены ?after= и ?before=.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
 
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return encode_cursor(self.paginator.position(self.object_list[-1]))
 
-def page_paginator(request, post):
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return encode_cursor(self.paginator.position(self.object_list[0]))
+
+
+class CursorPaginator:
+    """Keyset-пагинация по паре (pub_date, id).
+
+    Вместо COUNT(*) и OFFSET каждая страница — это диапазонный запрос
+    от последней показанной записи, поэтому глубокие страницы стоят
+    столько же, сколько первая. Подходит и для queryset'ов .values().
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id'),
+                 descending=True):
+        # Ключи из связанной таблицы (timeline_entries__pub_date) берутся
+        # через аннотации: F() переиспользует JOIN фильтра ленты, а
+        # отдельный filter() по связи добавил бы ещё один.
+        related = {
+            key.replace('__', '_'): F(key) for key in keys if '__' in key
+        }
+        if related:
+            object_list = object_list.annotate(**related)
+        self.object_list = object_list
+        self.per_page = per_page
+        self.keys = tuple(key.replace('__', '_') for key in keys)
+        self.descending = descending
+
+    def position(self, obj):
+        if isinstance(obj, dict):
+            return tuple(obj[key] for key in self.keys)
+        return tuple(getattr(obj, key) for key in self.keys)
+
+    def _ordering(self, reverse):
+        desc = self.descending != reverse
+        return [f'-{key}' if desc else key for key in self.keys]
+
+    def _seek(self, position, forward):
+        first, second = self.keys
+        value, pk = position
+        # Двигаемся "вниз" по сортировке, если идём вперёд по убывающей
+        # ленте или назад по возрастающей.
+        lookup = 'lt' if forward == self.descending else 'gt'
+        return (
+            Q(**{f'{first}__{lookup}': value})
+            | Q(**{first: value, f'{second}__{lookup}': pk})
+        )
+
+    def get_page(self, after=None, before=None):
+        after = decode_cursor(after) if after else None
+        before = decode_cursor(before) if before else None
+        queryset = self.object_list
+        if before is not None:
+            queryset = queryset.filter(self._seek(before, forward=False))
+            rows = list(
+                queryset.order_by(*self._ordering(reverse=True))
+                [:self.per_page + 1]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return CursorPage(rows, self, True, has_previous)
+        if after is not None:
+            queryset = queryset.filter(self._seek(after, forward=True))
+        rows = list(
+            queryset.order_by(*self._ordering(reverse=False))
+            [:self.per_page + 1]
+        )
+        has_next = len(rows) > self.per_page
+        return CursorPage(
+            rows[:self.per_page], self, has_next, after is not None
+        )
+
+
+def page_paginator(request, post, cursor=None, keys=('pub_date', 'id')):
+    """Разбивает ленту на страницы.
+
+    По умолчанию работает обычный Paginator с ?page=. Курсорный режим
+    включается аргументом cursor=True или настройкой
+    POSTS_CURSOR_PAGINATION; keys — поля сортировки курсора.
+    """
+    if cursor is None:
+        cursor = getattr(settings, 'POSTS_CURSOR_PAGINATION', False)
+    if cursor:
+        paginator = CursorPaginator(post, POST_NUMBER, keys=keys)
+        return paginator.get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
     paginator = Paginator(post, POST_NUMBER)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def comment_paginator(request, comments):
+    """Первая или следующая по ?after= порция комментариев, от старых к
+    новым, с авторами в том же запросе."""
+    paginator = CursorPaginator(
+        comments.select_related('author'), COMMENT_NUMBER, descending=False
+    )
+    return paginator.get_page(after=request.GET.get('after'))
@@ -1,14 +1,23 @@
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.views.decorators.http import condition
 from .models import Post, Group, User, Follow
 from django.contrib.auth.decorators import login_required
 from .forms import PostForm, CommentForm
-from .utils import page_paginator
-from django.views.decorators.cache import cache_page
-
-
-@cache_page(60 * 15)
+from .utils import comment_paginator, page_paginator
+from . import counters, export, follows, thumbnails
+from .search import SearchResults
+from .cache import (
+    SHOWN_FIELDS, cache_feed, get_versions, make_etag, shown_digest,
+)
+from core.db import retry_on_locked
+from core.routers import read_replica
+
+
+@read_replica
+@cache_feed('index')
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_feed()
     title = "Последние обновления на сайте"
     page_obj = page_paginator(request, post_list)
     context = {
@@ -18,12 +27,14 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@read_replica
+@cache_feed('group:{slug}')
 def group_posts(request, slug):
     # Получаю объект класса групп
     group = get_object_or_404(Group, slug=slug)
-    posts = group.group_posts.all()
+    posts = Post.objects.for_group(group)
     page_obj = page_paginator(request, posts)
-    title = f"Последние {posts.count()} поста группы {slug}"
+    title = f"Последние {group.posts_count} поста группы {slug}"
     context = {
         'page_obj': page_obj,
         'group': group,
@@ -32,38 +43,88 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@read_replica
+@cache_feed('profile:{username}')
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    following = Follow.objects.filter(author=author).exists()
+    post_list = Post.objects.for_author(author)
+    following = (
+        request.user.is_authenticated
+        and author.pk in follows.for_user(request.user.pk)
+    )
     name = author.get_full_name()
     title = f"Профайл пользователя {name}"
     context = {
         'page_obj': page_paginator(request, post_list),
         'title': title,
         'author': author,
-        'count': post_list.count(),
+        'count': counters.for_user(author.pk).posts_count,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def post_detail_etag(request, post_id):
+    # Поиск по первичным ключам поста, автора, группы и счётчиков, без
+    # шаблонов. Автор и группа хэшируются так же, как в fragment_key.
+    state = Post.objects.filter(pk=post_id).values_list(
+        'updated', 'comments_count', 'author__counters__posts_count',
+        'image', *SHOWN_FIELDS
+    ).first()
+    if state is None:
+        return None
+    updated, comments, posts, image, *shown = state
+    return make_etag(
+        request, get_versions([f'post:{post_id}']), updated, comments,
+        posts, shown_digest(shown),
+        # Пока миниатюры нет, страница показывает оригинал
+        bool(image) and thumbnails.ready(image),
+    )
+
+
+@read_replica
+@condition(etag_func=post_detail_etag)
 def post_detail(request, post_id):
     # Здесь код запроса к модели и создание словаря контекста
-    post = get_object_or_404(Post, id=post_id)
-    total_author_posts = post.author.posts.count()
+    post = get_object_or_404(Post.objects.for_feed(), id=post_id)
+    total_author_posts = counters.for_user(post.author_id).posts_count
     form = CommentForm()
-    comments_list = post.posts_comment.all()
     context = {
         'post': post,
         'total_posts': total_author_posts,
         'form': form,
-        'comments': comments_list
+        'comments': comment_paginator(request, post.posts_comment.all())
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@read_replica
+@condition(etag_func=post_detail_etag)
+def post_comments(request, post_id):
+    # HTML-фрагмент со следующей порцией комментариев для кнопки
+    # «Показать ещё»
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post': post,
+        'comments': comment_paginator(request, post.posts_comment.all()),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    context = {
+        'title': f'Поиск: {query}' if query else 'Поиск',
+        'query': query,
+        'page_obj': page_paginator(
+            request, SearchResults(query), cursor=False
+        ),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@retry_on_locked
 def post_create(request):
     username = request.user.username
     form = PostForm(request.POST,
@@ -77,11 +138,13 @@ def post_create(request):
             post = form.save(False)
             post.author = request.user
             post.save()
+            thumbnails.pregenerate(post)
             return redirect('posts:profile', username=username)
     return render(request, "posts/create_post.html", context)
 
 
 @login_required
+@retry_on_locked
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if post.author != request.user:
@@ -93,7 +156,9 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.pregenerate(post)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -104,6 +169,21 @@ def post_edit(request, post_id):
 
 
 @login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user and not request.user.is_staff:
+        return redirect('posts:profile', username=username)
+    response = StreamingHttpResponse(
+        export.stream_archive(author), content_type='application/zip'
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{author.username}.zip"'
+    )
+    return response
+
+
+@login_required
+@retry_on_locked
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -115,11 +195,15 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@read_replica
 @login_required
 def follow_index(request):
     username = request.user
-    posts = Post.objects.filter(author__following__user=username)
-    post_obj = page_paginator(request, posts)
+    posts = Post.objects.for_follower(username)
+    post_obj = page_paginator(
+        request, posts,
+        keys=('timeline_entries__pub_date', 'timeline_entries__post_id')
+    )
     context = {
         'page_obj': post_obj,
         'title': "Мои подписки",
@@ -131,6 +215,7 @@ def follow_index(request):
 
 
 @login_required
+@retry_on_locked
 def profile_follow(request, username):
     if username != request.user.username:
         author = get_object_or_404(User, username=username)
@@ -142,6 +227,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@retry_on_locked
 def profile_unfollow(request, username):
     # попробовал вот такую запись но все сломалось,
     # Follow.objects.filter(
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -48,11 +49,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,9 +91,33 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение переживает запрос: PRAGMA и кэш страниц SQLite
+        # не теряются между запросами
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            # Сколько секунд ждать чужую блокировку записи
+            'timeout': 20,
+        },
     }
 }
 
+# PRAGMA для каждого нового соединения SQLite (core.db). WAL позволяет
+# читать во время записи, synchronous=NORMAL в режиме WAL не теряет
+# целостность, cache_size в КиБ со знаком минус, mmap_size в байтах.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 20000,
+    'temp_store': 'MEMORY',
+}
+
+# Повторы записи при «database is locked» (core.db.retry_on_locked):
+# число попыток и первая пауза в секундах, дальше она удваивается.
+DB_RETRY_ATTEMPTS = 5
+DB_RETRY_DELAY = 0.05
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -125,6 +154,10 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+# collectstatic складывает сюда файлы с хэшем в имени, манифест и сжатые
+# копии; отдаёт их core.middleware.StaticFilesMiddleware.
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -138,8 +171,80 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Общий для всех воркеров машины кэш в файле SQLite. Тесты получают
+# отдельный кэш в памяти, чтобы не видеть страницы прошлых прогонов.
+TESTING = 'test' in sys.argv[1:2] or 'pytest' in sys.modules
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': (
+            ':memory:' if TESTING else os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {
+            'MAX_BYTES': 256 * 1024 * 1024,
+        },
     }
 }
+
+# Реплики только для чтения (core.routers). Локально роль реплики играет
+# второй файл SQLite из YATUBE_REPLICA_DB — копия db.sqlite3, которую
+# обновляет, например, litestream. В тестах реплика — зеркало default.
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
+if TESTING:
+    DATABASES['replica'] = {
+        **DATABASES['default'], 'TEST': {'MIRROR': 'default'},
+    }
+elif os.environ.get('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'], 'NAME': os.environ['YATUBE_REPLICA_DB'],
+    }
+    DATABASE_REPLICAS = ['replica']
+# Сколько секунд после записи клиент читает из основной базы, пока
+# реплика догоняет его изменения. Столько же после сброса версии ленты
+# её страница при промахе кэша строится по основной базе.
+REPLICA_PIN_SECONDS = 10
+
+# Курсорная пагинация лент (?after=/?before=) вместо ?page=:
+# без COUNT(*) и OFFSET, глубокие страницы стоят как первая.
+POSTS_CURSOR_PAGINATION = False
+
+# Размер пачки при раскладке постов по лентам подписчиков.
+TIMELINE_BATCH_SIZE = 1000
+
+# Время жизни закэшированных лент. Страницы сбрасываются раньше, как только
+# меняется версия ленты (см. posts.cache), поэтому TTL может быть долгим.
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Время жизни отрендеренных фрагментов постов (posts.templatetags.fragments).
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# Время жизни закэшированных подписок пользователя (posts.follows).
+# Сбрасываются сразу при подписке и отписке.
+FOLLOWING_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Миниатюры создаются фоновым пулом сразу после сохранения поста,
+# в запросе они только читаются (см. posts.thumbnails).
+THUMBNAIL_BACKEND = 'posts.thumbnails.PregeneratedThumbnailBackend'
+THUMBNAIL_PRESETS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+# 0 — без фонового пула, миниатюры создаются сразу после коммита.
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_QUEUE_SIZE = 100
+
+# Нормализация картинок постов при загрузке (posts.images).
+IMAGE_UPLOAD_MAX_SIZE = (1920, 1920)
+IMAGE_UPLOAD_FORMAT = 'JPEG'
+IMAGE_UPLOAD_QUALITY = 85
+IMAGE_UPLOAD_SPOOL_SIZE = 2 * 1024 * 1024
+
+# Замеры SQL, шаблонов, кэша и миниатюр каждого запроса: заголовок
+# Server-Timing и JSON-строка в логгер core.performance.
+PERFORMANCE_METRICS = True
+
+# Профиль отдельного запроса сотрудника по X-Profile или ?_profile:
+# дампы cProfile и отчёт tracemalloc (топ PROFILING_TOP строк).
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILING_TOP = 25
+PROFILING_FRAMES = 10
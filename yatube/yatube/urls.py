@@ -25,6 +25,7 @@ urlpatterns = [
     # импорт правил из приложения posts
     path('auth/', include('django.contrib.auth.urls')),
     path('auth/', include('users.urls')),
+    path('api/v1/', include('posts.api_urls', namespace='api')),
     path('', include('posts.urls', namespace="posts")),
     path('admin/', admin.site.urls),
     path('about/', include('about.urls', namespace='about')),
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Прогрев до первого запроса; с gunicorn --preload он выполняется в
+# мастере, и воркеры получают всё готовым через fork
+from core.boot import warm_up  # noqa: E402
+
+warm_up()